@@ -3,17 +3,49 @@ from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List
 import os
-import json
+import time
 import asyncio
 from anthropic import AsyncAnthropic
 from database import get_db_pool
 from api.auth import verify_access_token
+from utils.cache import ResponseCache
+from utils.course_events import add_event_handler
 
 router = APIRouter(prefix="/chat")
 
 # Initialize Anthropic client
 anthropic_client = AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
 
+# System prompts by ("chat_prompt", course_id, module_index), so a chat turn needs no queries;
+# the TTL only matters if this process misses an event
+chat_prompts = ResponseCache(
+    maxsize=int(os.getenv("CHAT_PROMPT_CACHE_MAX_ENTRIES", "512")),
+    ttl=float(os.getenv("CHAT_PROMPT_CACHE_TTL_SECONDS", "3600")),
+)
+# Course events after which a module's name or content may differ
+CHAT_PROMPT_STAGES = {"modules_completed", "course_deleted"}
+
+# Mark the system prompt and the conversation so far for Anthropic prompt caching, so a
+# follow-up question only pays input processing for the messages added since the last turn
+CHAT_PROMPT_CACHING = os.getenv("CHAT_PROMPT_CACHING", "true").lower() == "true"
+# Token usage and time to first token, summed over every chat turn of this process
+chat_usage = {
+    "turns": 0,
+    "input_tokens": 0,
+    "cache_read_input_tokens": 0,
+    "cache_creation_input_tokens": 0,
+    "output_tokens": 0,
+    "first_token_seconds": 0.0,
+}
+
+
+def invalidate_chat_prompts(event: dict):
+    if event["stage"] in CHAT_PROMPT_STAGES:
+        chat_prompts.invalidate_course(event["course_id"])
+
+
+add_event_handler(invalidate_chat_prompts)
+
 
 class Message(BaseModel):
     role: str  # 'user' or 'assistant'
@@ -26,47 +58,11 @@ class ChatRequest(BaseModel):
     messages: List[Message]
 
 
-async def generate_stream(course_id: int, module_index: int, messages: List[Message]):
-    """Generate streaming chat responses using Claude API"""
-    db_pool = get_db_pool()
-
-    try:
-        # Fetch course and module information for context
-        async with db_pool.acquire() as connection:
-            course = await connection.fetchrow(
-                "SELECT name, description FROM courses WHERE id = $1",
-                course_id
-            )
-
-            if not course:
-                yield f"data: {{'error': 'Course not found'}}\n\n"
-                return
-
-            # Get module content
-            modules_data = await connection.fetchval(
-                "SELECT modules FROM courses WHERE id = $1",
-                course_id
-            )
-
-            if not modules_data:
-                yield f"data: {{'error': 'No modules found'}}\n\n"
-                return
-
-            # Parse JSON string to list
-            modules = json.loads(modules_data) if isinstance(modules_data, str) else modules_data
-
-            if module_index < 0 or module_index >= len(modules):
-                yield f"data: {{'error': 'Module not found'}}\n\n"
-                return
-
-            module = modules[module_index]
-            module_name = module.get('name', f'Module {module_index + 1}')
-            module_content = module.get('content', '')
-
-        # Prepare system message with context
-        system_message = f"""You are an AI learning coach helping a student understand course material.
+def build_system_prompt(course_name: str, module_name: str, module_content: str) -> str:
+    """System message with the module as context"""
+    return f"""You are an AI learning coach helping a student understand course material.
 
-Course: {course['name']}
+Course: {course_name}
 Module: {module_name}
 
 Module Content:
@@ -89,6 +85,110 @@ IMPORTANT FORMATTING RULES:
 
 Keep your responses focused on the course material and learning objectives."""
 
+
+async def load_system_prompt(course_id: int, module_index: int) -> str:
+    """Build a module's system prompt from the database; raises LookupError if the course or module doesn't exist"""
+    db_pool = get_db_pool()
+    async with db_pool.acquire() as connection:
+        course = await connection.fetchrow(
+            """
+            SELECT c.name, m.name AS module_name, m.content AS module_content
+            FROM courses c
+            LEFT JOIN course_modules m ON m.course_id = c.id AND m.module_index = $2
+            WHERE c.id = $1
+            """,
+            course_id, module_index
+        )
+
+    if not course:
+        raise LookupError("Course not found")
+    if course['module_name'] is None:
+        raise LookupError("Module not found")
+    return build_system_prompt(course['name'], course['module_name'], course['module_content'])
+
+
+def cached_request(system_message: str, messages: list[dict]) -> tuple[list[dict], list[dict]]:
+    """
+    system and messages with prompt-cache breakpoints
+
+    One on the system prompt, which is the same for every turn on a module,
+    and one on the newest message. The next turn repeats this turn's messages,
+    so it reads everything up to here from the cache and only the reply and
+    the new question are processed again. Prompts shorter than the model's
+    minimum are simply not cached.
+    """
+    ephemeral = {"type": "ephemeral"}
+    system = [{"type": "text", "text": system_message, "cache_control": ephemeral}]
+    *history, newest = messages
+    newest = {"role": newest["role"], "content": [{"type": "text", "text": newest["content"], "cache_control": ephemeral}]}
+    return system, [*history, newest]
+
+
+def record_usage(usage, first_token_seconds: float):
+    read = usage.cache_read_input_tokens or 0
+    written = usage.cache_creation_input_tokens or 0
+    chat_usage["turns"] += 1
+    chat_usage["input_tokens"] += usage.input_tokens
+    chat_usage["cache_read_input_tokens"] += read
+    chat_usage["cache_creation_input_tokens"] += written
+    chat_usage["output_tokens"] += usage.output_tokens
+    chat_usage["first_token_seconds"] += first_token_seconds
+    print(
+        f"💬 Chat turn: {usage.input_tokens + read + written} input tokens ({read} from cache, {written} cached), "
+        f"{usage.output_tokens} output tokens, first token after {first_token_seconds:.2f}s"
+    )
+
+
+def chat_metrics() -> dict:
+    turns = chat_usage["turns"]
+    prompt_tokens = chat_usage["input_tokens"] + chat_usage["cache_read_input_tokens"] + chat_usage["cache_creation_input_tokens"]
+    return {
+        "prompt_caching": CHAT_PROMPT_CACHING,
+        "turns": turns,
+        "input_tokens": chat_usage["input_tokens"],
+        "cache_read_input_tokens": chat_usage["cache_read_input_tokens"],
+        "cache_creation_input_tokens": chat_usage["cache_creation_input_tokens"],
+        "output_tokens": chat_usage["output_tokens"],
+        "cache_hit_ratio": round(chat_usage["cache_read_input_tokens"] / prompt_tokens, 3) if prompt_tokens else 0.0,
+        "avg_first_token_seconds": round(chat_usage["first_token_seconds"] / turns, 3) if turns else 0.0,
+    }
+
+
+async def stream_reply(system_message: str, messages: list[dict]):
+    """Stream Claude's reply as text chunks and record the turn's token usage"""
+    system: str | list[dict] = system_message
+    if CHAT_PROMPT_CACHING and messages:
+        system, messages = cached_request(system_message, messages)
+
+    started = time.perf_counter()
+    first_token_seconds = None
+    async with anthropic_client.messages.stream(
+        model="claude-sonnet-4-5-20250929",
+        max_tokens=2048,
+        system=system,
+        messages=messages,
+    ) as stream:
+        async for text in stream.text_stream:
+            if first_token_seconds is None:
+                first_token_seconds = time.perf_counter() - started
+            yield text
+        message = await stream.get_final_message()
+    record_usage(message.usage, first_token_seconds or time.perf_counter() - started)
+
+
+async def generate_stream(course_id: int, module_index: int, messages: List[Message]):
+    """Generate streaming chat responses using Claude API"""
+    try:
+        # Context for the coach; only the first turn on a module reads the database
+        try:
+            system_message = await chat_prompts.get_or_load(
+                ("chat_prompt", course_id, module_index),
+                lambda: load_system_prompt(course_id, module_index)
+            )
+        except LookupError as e:
+            yield f"data: {{'error': '{e}'}}\n\n"
+            return
+
         # Convert messages to Anthropic format
         anthropic_messages = [
             {"role": msg.role, "content": msg.content}
@@ -96,18 +196,12 @@ Keep your responses focused on the course material and learning objectives."""
         ]
 
         # Stream response from Claude
-        async with anthropic_client.messages.stream(
-            model="claude-sonnet-4-5-20250929",
-            max_tokens=2048,
-            system=system_message,
-            messages=anthropic_messages,
-        ) as stream:
-            async for text in stream.text_stream:
-                # Escape newlines in the text to prevent SSE parsing issues
-                escaped_text = text.replace('\n', '\\n').replace('\r', '\\r')
-                # Send each token as SSE
-                yield f"data: {escaped_text}\n\n"
-                await asyncio.sleep(0)  # Allow other tasks to run
+        async for text in stream_reply(system_message, anthropic_messages):
+            # Escape newlines in the text to prevent SSE parsing issues
+            escaped_text = text.replace('\n', '\\n').replace('\r', '\\r')
+            # Send each token as SSE
+            yield f"data: {escaped_text}\n\n"
+            await asyncio.sleep(0)  # Allow other tasks to run
 
         # Send end marker
         yield "data: [DONE]\n\n"
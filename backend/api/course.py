@@ -1,14 +1,85 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, Request, Response, Query
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
-import json
+import os
+import asyncio
+import orjson
 from database import get_db_pool
 from api.auth import verify_access_token
+from utils.course_events import notify_course_event, subscribe, add_event_handler, FELL_BEHIND
+from utils.http_cache import make_etag, cache_headers, is_not_modified, not_modified
+from utils.cache import ResponseCache
+from utils.singleflight import SingleFlight
+from utils.render_scheduler import render_scheduler, lesson_job, INTERACTIVE, PREFETCH, UPGRADE
+from utils.storage_manager import record_access, remove_course_videos
+from utils.task_registry import course_tasks
 from utils.pdf_summarizer import summarize_pdf_with_claude
 from utils.module_generator import generate_course_modules
 from utils.question_generator import generate_all_course_questions
 
 router = APIRouter(prefix="/courses")
 
+# Shared cache for the unauthenticated share-link endpoints
+public_cache = ResponseCache(
+    maxsize=int(os.getenv("PUBLIC_CACHE_MAX_ENTRIES", "1024")),
+    ttl=float(os.getenv("PUBLIC_CACHE_TTL_SECONDS", "300")),
+)
+PUBLIC_CACHE_CONTROL = f"public, max-age={int(os.getenv('PUBLIC_CACHE_MAX_AGE', '60'))}"
+
+
+def invalidate_public_cache(event: dict):
+    """Every course event marks a write, so drop that course's cached public responses"""
+    public_cache.invalidate_course(event["course_id"])
+
+
+add_event_handler(invalidate_public_cache)
+
+# Concurrent first views of a lesson share one claim and one video generation
+lesson_claims = SingleFlight()
+video_generations = SingleFlight()
+
+# Render every module's video as soon as the modules exist, instead of on first view
+PREFETCH_LESSONS = os.getenv("PREFETCH_LESSONS", "false").lower() == "true"
+course_prefetches = SingleFlight()
+
+# Publish a fast preview render first, then replace it with a VIDEO_QUALITY render in the background
+PREVIEW_VIDEOS = os.getenv("PREVIEW_VIDEOS", "true").lower() == "true"
+VIDEO_QUALITY = os.getenv("VIDEO_QUALITY", "medium")
+FIRST_VIDEO_QUALITY = "preview" if PREVIEW_VIDEOS else VIDEO_QUALITY
+video_upgrades = SingleFlight()
+failed_upgrades: set[tuple[int, int]] = set()
+
+
+def cancel_deleted_course(event: dict):
+    """Stop whatever this process is still doing for a deleted course"""
+    if event["stage"] == "course_deleted":
+        course_id = event["course_id"]
+        course_tasks.cancel(course_id)
+        failed_upgrades.difference_update({key for key in failed_upgrades if key[0] == course_id})
+
+
+add_event_handler(cancel_deleted_course)
+
+# Lesson columns returned by the lesson endpoints
+LESSON_FIELDS = (
+    "lesson_content", "video_url", "video_status", "video_error", "video_quality",
+    "audio_url", "audio_status", "poster_url", "thumbnail_url",
+)
+LESSON_COLUMNS = ", ".join(LESSON_FIELDS + ("version", "updated_at"))
+
+
+def lesson_body(lesson) -> dict:
+    return {key: lesson[key] for key in LESSON_FIELDS}
+
+# Course modules re-assembled into the JSON array shape the API has always returned
+MODULES_JSON_SQL = """
+    (
+        SELECT jsonb_agg(jsonb_build_object('name', m.name, 'content', m.content) ORDER BY m.module_index)
+        FROM course_modules m
+        WHERE m.course_id = c.id
+    )
+"""
+
 
 async def check_and_generate_modules(course_id: int):
     """Check if all PDFs have summaries, and if so, generate course modules"""
@@ -30,25 +101,21 @@ async def check_and_generate_modules(course_id: int):
                 print(f"⏳ Course {course_id}: Still waiting for {pending_pdfs} PDF summaries")
                 return
 
-            # Check current module status
-            status = await connection.fetchval(
-                "SELECT modules_status FROM courses WHERE id = $1",
+            # Set status to generating, unless it already is or is done; one statement,
+            # since the summary tasks run concurrently and may all find 0 pending
+            claimed = await connection.fetchval(
+                """
+                UPDATE courses SET modules_status = 'generating', modules_error = NULL
+                WHERE id = $1 AND modules_status NOT IN ('generating', 'completed')
+                RETURNING id
+                """,
                 course_id
             )
 
-            if status == 'generating':
-                print(f"ℹ️ Course {course_id}: Module generation already in progress")
+            if claimed is None:
+                print(f"ℹ️ Course {course_id}: Module generation already in progress or completed")
                 return
-
-            if status == 'completed':
-                print(f"ℹ️ Course {course_id}: Modules already generated")
-                return
-
-            # Set status to generating
-            await connection.execute(
-                "UPDATE courses SET modules_status = 'generating', modules_error = NULL WHERE id = $1",
-                course_id
-            )
+            await notify_course_event(connection, course_id, "modules_generating")
 
             # Fetch course info and PDF summaries
             course = await connection.fetchrow(
@@ -77,11 +144,26 @@ async def check_and_generate_modules(course_id: int):
         # Store result
         async with db_pool.acquire() as connection:
             if modules:
-                await connection.execute(
-                    "UPDATE courses SET modules = $1, modules_status = 'completed' WHERE id = $2",
-                    json.dumps(modules),
-                    course_id
-                )
+                async with connection.transaction():
+                    await connection.execute(
+                        "DELETE FROM course_modules WHERE course_id = $1",
+                        course_id
+                    )
+                    await connection.executemany(
+                        """
+                        INSERT INTO course_modules (course_id, module_index, name, content)
+                        VALUES ($1, $2, $3, $4)
+                        """,
+                        [
+                            (course_id, module_index, module['name'], module['content'])
+                            for module_index, module in enumerate(modules)
+                        ]
+                    )
+                    await connection.execute(
+                        "UPDATE courses SET modules_status = 'completed' WHERE id = $1",
+                        course_id
+                    )
+                await notify_course_event(connection, course_id, "modules_completed", module_count=len(modules))
                 print(f"✅ Course {course_id}: Generated {len(modules)} modules")
             else:
                 await connection.execute(
@@ -89,6 +171,7 @@ async def check_and_generate_modules(course_id: int):
                     "Failed to generate valid modules from course content",
                     course_id
                 )
+                await notify_course_event(connection, course_id, "modules_error")
                 print(f"⚠️ Course {course_id}: Failed to generate modules")
                 return
 
@@ -125,10 +208,21 @@ async def check_and_generate_modules(course_id: int):
                             option_text
                         )
 
+                # Touch the course so its version (and question bank ETags) change
+                await connection.execute(
+                    "UPDATE courses SET updated_at = CURRENT_TIMESTAMP WHERE id = $1",
+                    course_id
+                )
+
                 print(f"✅ Course {course_id}: Generated {len(questions)} knowledge test questions")
             else:
                 print(f"⚠️ Course {course_id}: Failed to generate questions")
 
+            await notify_course_event(connection, course_id, "questions_completed", question_count=len(questions))
+
+        if PREFETCH_LESSONS:
+            course_tasks.track(course_id, course_prefetches.start(course_id, prefetch_course_lessons, course_id))
+
     except Exception as e:
         error_msg = str(e)
         print(f"❌ Error generating modules for course {course_id}: {error_msg}")
@@ -139,10 +233,45 @@ async def check_and_generate_modules(course_id: int):
                     error_msg,
                     course_id
                 )
+                await notify_course_event(connection, course_id, "modules_error")
         except Exception as db_error:
             print(f"❌ Failed to update error status: {db_error}")
 
 
+async def prefetch_course_lessons(course_id: int):
+    """Create every lesson up front and render the videos in module order at prefetch priority"""
+    db_pool = get_db_pool()
+    async with db_pool.acquire() as connection:
+        await connection.execute(
+            """
+            INSERT INTO module_lessons (course_id, module_index, lesson_content, video_status)
+            SELECT course_id, module_index, content, 'pending'
+            FROM course_modules
+            WHERE course_id = $1
+            ON CONFLICT (course_id, module_index) DO NOTHING
+            """,
+            course_id
+        )
+        pending = await connection.fetch(
+            """
+            SELECT m.module_index, m.name, l.lesson_content
+            FROM course_modules m
+            JOIN module_lessons l ON l.course_id = m.course_id AND l.module_index = m.module_index
+            WHERE m.course_id = $1 AND l.video_status = 'pending'
+            ORDER BY m.module_index
+            """,
+            course_id
+        )
+
+    print(f"📦 Course {course_id}: Prefetching {len(pending)} lesson videos")
+    for lesson in pending:
+        # Joins the render if a learner already started this module; otherwise the
+        # pending -> generating claim skips modules that finished in the meantime
+        await asyncio.shield(
+            start_video_generation(course_id, lesson['module_index'], lesson['name'], lesson['lesson_content'], PREFETCH)
+        )
+
+
 async def summarize_single_pdf(pdf_id: int, pdf_bytes: bytes, filename: str, course_id: int):
     """Background task to summarize a single PDF and update the database"""
     try:
@@ -160,6 +289,7 @@ async def summarize_single_pdf(pdf_id: int, pdf_bytes: bytes, filename: str, cou
                 """,
                 summary, pdf_id
             )
+            await notify_course_event(connection, course_id, "pdf_summarized", pdf_id=pdf_id)
         print(f"✅ Summarized PDF: {filename}")
 
         # Check if all PDFs are now summarized and trigger module generation if so
@@ -170,40 +300,135 @@ async def summarize_single_pdf(pdf_id: int, pdf_bytes: bytes, filename: str, cou
 
 
 @router.get("/")
-async def get_courses(user: dict = Depends(verify_access_token)):
-    """Get all courses"""
+async def get_courses(
+    response: Response,
+    limit: int = Query(50, ge=1, le=100),
+    after: Optional[int] = Query(None, description="Return courses with an id greater than this cursor"),
+    include: Optional[str] = Query(None, description="Comma-separated extras to include, e.g. 'modules'"),
+    user: dict = Depends(verify_access_token)
+):
+    """Get a page of course summaries (module count instead of module content)"""
+    includes = set(include.split(",")) if include else set()
+    modules_column = f", {MODULES_JSON_SQL} AS modules" if "modules" in includes else ""
+
     db_pool = get_db_pool()
     async with db_pool.acquire() as connection:
-        courses = await connection.fetch("SELECT * FROM courses WHERE user_id = $1", user["user_id"])
-        result = []
-        for course in courses:
-            course_dict = dict(course)
-            # Parse modules JSON string to array
-            if course_dict.get('modules'):
-                course_dict['modules'] = json.loads(course_dict['modules'])
-            result.append(course_dict)
-        return result
+        # Fetch one extra row to learn whether another page exists
+        courses = await connection.fetch(
+            f"""
+            SELECT
+                c.id, c.user_id, c.name, c.code, c.description,
+                c.modules_status, c.modules_error, c.created_at,
+                (SELECT COUNT(*) FROM course_modules m WHERE m.course_id = c.id) AS module_count
+                {modules_column}
+            FROM courses c
+            WHERE c.user_id = $1 AND ($2::INTEGER IS NULL OR c.id > $2)
+            ORDER BY c.id
+            LIMIT $3
+            """,
+            user["user_id"], after, limit + 1
+        )
+
+    if len(courses) > limit:
+        courses = courses[:limit]
+        response.headers["X-Next-Cursor"] = str(courses[-1]["id"])
+
+    return [dict(course) for course in courses]
 
 @router.get("/{course_id}")
-async def get_course(course_id: int, user: dict = Depends(verify_access_token)):
+async def get_course(
+    course_id: int,
+    request: Request,
+    response: Response,
+    user: dict = Depends(verify_access_token)
+):
     """Get course by ID"""
     db_pool = get_db_pool()
     async with db_pool.acquire() as connection:
+        # Check the version first so unchanged courses skip loading the modules
+        version = await connection.fetchrow(
+            "SELECT version, updated_at FROM courses WHERE id = $1 AND user_id = $2",
+            course_id, user["user_id"]
+        )
+        if not version:
+            raise HTTPException(status_code=404, detail="Course not found")
+
+        headers = cache_headers(make_etag("course", course_id, version['version']), version['updated_at'])
+        if is_not_modified(request, headers["ETag"], version['updated_at']):
+            return not_modified(headers)
+
         course = await connection.fetchrow(
-            "SELECT * FROM courses WHERE id = $1 AND user_id = $2",
+            f"SELECT c.*, {MODULES_JSON_SQL} AS modules FROM courses c WHERE c.id = $1 AND c.user_id = $2",
             course_id, user["user_id"]
         )
         if not course:
             raise HTTPException(status_code=404, detail="Course not found")
-        course_dict = dict(course)
-        # Parse modules JSON string to array
-        if course_dict.get('modules'):
-            course_dict['modules'] = json.loads(course_dict['modules'])
-        return course_dict
+
+        response.headers.update(cache_headers(make_etag("course", course_id, course['version']), course['updated_at']))
+        return dict(course)
     
+@router.get("/{course_id}/events")
+async def course_events(course_id: int, request: Request, user: dict = Depends(verify_access_token)):
+    """Stream course generation progress as server-sent events"""
+    db_pool = get_db_pool()
+    async with db_pool.acquire() as connection:
+        course = await connection.fetchrow(
+            "SELECT id FROM courses WHERE id = $1 AND user_id = $2",
+            course_id, user["user_id"]
+        )
+        if not course:
+            raise HTTPException(status_code=404, detail="Course not found")
+
+    async def event_stream():
+        async with subscribe(course_id) as queue:
+            # Snapshot after subscribing so no event can slip between the two
+            async with db_pool.acquire() as connection:
+                snapshot = await connection.fetchrow(
+                    """
+                    SELECT
+                        c.modules_status,
+                        (SELECT COUNT(*) FROM course_pdfs p WHERE p.course_id = c.id AND p.summary IS NULL) AS pending_pdfs,
+                        (SELECT COUNT(*) FROM module_questions q WHERE q.course_id = c.id) AS question_count
+                    FROM courses c
+                    WHERE c.id = $1
+                    """,
+                    course_id
+                )
+                lessons = await connection.fetch(
+                    "SELECT module_index, video_status, video_quality, audio_status FROM module_lessons WHERE course_id = $1 ORDER BY module_index",
+                    course_id
+                )
+            snapshot_event = {
+                "course_id": course_id,
+                "stage": "snapshot",
+                **dict(snapshot),
+                "lessons": [dict(lesson) for lesson in lessons],
+            }
+            yield f"data: {orjson.dumps(snapshot_event).decode()}\n\n"
+
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"  # Keep proxies from closing an idle stream
+                    continue
+                if event is FELL_BEHIND:
+                    # Events were dropped; EventSource reconnects and gets a fresh snapshot
+                    return
+                yield f"data: {orjson.dumps(event).decode()}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",  # Disable buffering in nginx
+        }
+    )
+
 @router.post("/")
 async def create_course(
-    background_tasks: BackgroundTasks,
     name: str = Form(...),
     code: str = Form(...),
     description: Optional[str] = Form(None),
@@ -212,41 +437,45 @@ async def create_course(
 ):
     """Create a new course with optional PDFs (summaries generated in background)"""
     db_pool = get_db_pool()
+    pdfs = []
     async with db_pool.acquire() as connection:
-        # Create the course
-        course_id = await connection.fetchval(
-            """
-            INSERT INTO courses (name, code, description, user_id)
-            VALUES ($1, $2, $3, $4)
-            RETURNING id
-            """,
-            name, code, description, user["user_id"]
-        )
+        # Every PDF row must exist before any summary task can check whether it was the last one
+        async with connection.transaction():
+            # Create the course
+            course_id = await connection.fetchval(
+                """
+                INSERT INTO courses (name, code, description, user_id)
+                VALUES ($1, $2, $3, $4)
+                RETURNING id
+                """,
+                name, code, description, user["user_id"]
+            )
 
-        # Store PDFs immediately without summaries, then schedule background summarization
-        for file in files:
-            if file.filename and file.filename.endswith('.pdf'):
-                pdf_bytes = await file.read()
+            # Store PDFs immediately without summaries
+            for file in files:
+                if file.filename and file.filename.endswith('.pdf'):
+                    pdf_bytes = await file.read()
 
-                # Store PDF without summary first
-                pdf_id = await connection.fetchval(
-                    """
-                    INSERT INTO course_pdfs (course_id, filename, pdf_data, summary)
-                    VALUES ($1, $2, $3, $4)
-                    RETURNING id
-                    """,
-                    course_id, file.filename, pdf_bytes, None
-                )
+                    # Store PDF without summary first
+                    pdf_id = await connection.fetchval(
+                        """
+                        INSERT INTO course_pdfs (course_id, filename, pdf_data, summary)
+                        VALUES ($1, $2, $3, $4)
+                        RETURNING id
+                        """,
+                        course_id, file.filename, pdf_bytes, None
+                    )
+                    pdfs.append((pdf_id, pdf_bytes, file.filename))
+
+    # Summarize every PDF in the background; check_and_generate_modules is called after each one
+    for pdf_id, pdf_bytes, filename in pdfs:
+        course_tasks.start(course_id, summarize_single_pdf(pdf_id, pdf_bytes, filename, course_id))
 
-                # Schedule summarization in background for this specific PDF
-                background_tasks.add_task(summarize_single_pdf, pdf_id, pdf_bytes, file.filename, course_id)
-        
-        # If no PDFs uploaded, trigger module generation immediately
-        # Otherwise, check_and_generate_modules will be called after each PDF is summarized
-        if not files or not any(f.filename and f.filename.endswith('.pdf') for f in files):
-            background_tasks.add_task(check_and_generate_modules, course_id)
-        
-        return {"id": course_id}
+    # If no PDFs uploaded, trigger module generation immediately
+    if not pdfs:
+        course_tasks.start(course_id, check_and_generate_modules(course_id))
+
+    return {"id": course_id}
 
 @router.get("/{course_id}/pdfs")
 async def get_course_pdfs(course_id: int, user: dict = Depends(verify_access_token)):
@@ -267,7 +496,6 @@ async def get_course_pdfs(course_id: int, user: dict = Depends(verify_access_tok
 @router.post("/{course_id}/retry-modules")
 async def retry_module_generation(
     course_id: int,
-    background_tasks: BackgroundTasks,
     user: dict = Depends(verify_access_token)
 ):
     """Retry module generation for a course"""
@@ -286,9 +514,10 @@ async def retry_module_generation(
             "UPDATE courses SET modules_status = 'pending', modules_error = NULL WHERE id = $1",
             course_id
         )
+        await notify_course_event(connection, course_id, "modules_pending")
 
     # Trigger module generation in background
-    background_tasks.add_task(check_and_generate_modules, course_id)
+    course_tasks.start(course_id, check_and_generate_modules(course_id))
 
     return {"detail": "Module generation queued"}
 
@@ -296,96 +525,198 @@ async def retry_module_generation(
 async def get_module_lesson(
     course_id: int,
     module_index: int,
-    background_tasks: BackgroundTasks,
+    request: Request,
+    response: Response,
     user: dict = Depends(verify_access_token)
 ):
     """Get or generate a lesson for a specific module"""
     db_pool = get_db_pool()
 
     async with db_pool.acquire() as connection:
-        # Check if course exists and get the module
-        course = await connection.fetchrow(
-            "SELECT modules FROM courses WHERE id = $1 AND user_id = $2",
-            course_id, user["user_id"]
+        # Check course, module and lesson version without loading any content
+        existing = await connection.fetchrow(
+            """
+            SELECT m.name AS module_name, l.video_status, l.video_quality, l.version, l.updated_at
+            FROM courses c
+            LEFT JOIN course_modules m ON m.course_id = c.id AND m.module_index = $2
+            LEFT JOIN module_lessons l ON l.course_id = c.id AND l.module_index = $2
+            WHERE c.id = $1 AND c.user_id = $3
+            """,
+            course_id, module_index, user["user_id"]
         )
-        if not course:
+        if not existing:
             raise HTTPException(status_code=404, detail="Course not found")
-
-        modules = json.loads(course['modules']) if course['modules'] else []
-        if module_index < 0 or module_index >= len(modules):
+        if existing['module_name'] is None:
             raise HTTPException(status_code=404, detail="Module not found")
 
-        module = modules[module_index]
+        record_access(course_id, module_index)
+        if existing['video_status'] == 'evicted':
+            # Deleted under the storage quota - render it again now that someone is watching
+            requeued = await requeue_evicted_video(connection, course_id, module_index)
+            if requeued:
+                existing = dict(existing) | dict(requeued)
+
+        if existing['video_status'] == 'pending' and not video_generations.in_flight((course_id, module_index)):
+            # Queued by prefetch (or orphaned by a restart) - a learner is waiting now
+            lesson_content = await connection.fetchval(
+                "SELECT lesson_content FROM module_lessons WHERE course_id = $1 AND module_index = $2",
+                course_id, module_index
+            )
+            start_video_generation(course_id, module_index, existing['module_name'], lesson_content)
+        elif video_generations.in_flight((course_id, module_index)):
+            prioritize_video_generation(course_id, module_index)
+        elif needs_upgrade(existing) and not video_upgrades.in_flight((course_id, module_index)) \
+                and (course_id, module_index) not in failed_upgrades:
+            # Upgrade lost to a restart - queue it again
+            lesson_content = await connection.fetchval(
+                "SELECT lesson_content FROM module_lessons WHERE course_id = $1 AND module_index = $2",
+                course_id, module_index
+            )
+            start_video_upgrade(course_id, module_index, existing['module_name'], lesson_content)
 
-        # Check if lesson already exists
+        if existing['version'] is not None:
+            headers = cache_headers(make_etag("lesson", course_id, module_index, existing['version']), existing['updated_at'])
+            if is_not_modified(request, headers["ETag"], existing['updated_at']):
+                return not_modified(headers)
+
+            lesson = await connection.fetchrow(
+                f"""
+                SELECT {LESSON_COLUMNS}
+                FROM module_lessons
+                WHERE course_id = $1 AND module_index = $2
+                """,
+                course_id, module_index
+            )
+            response.headers.update(cache_headers(make_etag("lesson", course_id, module_index, lesson['version']), lesson['updated_at']))
+            return lesson_body(lesson)
+
+    # First view: create the lesson (or join a concurrent creation) and return the pending record
+    lesson = await lesson_claims.do(
+        (course_id, module_index),
+        claim_module_lesson, course_id, module_index, existing['module_name']
+    )
+    response.headers.update(cache_headers(make_etag("lesson", course_id, module_index, lesson['version']), lesson['updated_at']))
+    return lesson_body(lesson)
+
+async def claim_module_lesson(course_id: int, module_index: int, module_name: str) -> dict:
+    """Create the lesson row if it is missing, start its video, and return the lesson either way"""
+    db_pool = get_db_pool()
+    async with db_pool.acquire() as connection:
+        # Generate new lesson content (use module content as lesson for now)
         lesson = await connection.fetchrow(
-            """
-            SELECT lesson_content, video_url, video_status, video_error
-            FROM module_lessons
+            f"""
+            INSERT INTO module_lessons (course_id, module_index, lesson_content, video_status)
+            SELECT course_id, module_index, content, 'pending'
+            FROM course_modules
             WHERE course_id = $1 AND module_index = $2
+            ON CONFLICT (course_id, module_index) DO NOTHING
+            RETURNING {LESSON_COLUMNS}
             """,
             course_id, module_index
         )
 
         if lesson:
-            return dict(lesson)
-
-        # Generate new lesson content (use module content as lesson for now)
-        lesson_content = module['content']
-
-        # Create lesson record
-        await connection.execute(
-            """
-            INSERT INTO module_lessons (course_id, module_index, lesson_content, video_status)
-            VALUES ($1, $2, $3, 'pending')
-            """,
-            course_id, module_index, lesson_content
-        )
-
-    # Schedule video generation in background
-    background_tasks.add_task(generate_module_video, course_id, module_index, module['name'], lesson_content)
-
-    return {
-        "lesson_content": lesson_content,
-        "video_url": None,
-        "video_status": "pending",
-        "video_error": None
-    }
+            # Only the request that inserted the row schedules the video
+            start_video_generation(course_id, module_index, module_name, lesson['lesson_content'])
+        else:
+            # Another request (possibly in another process) created it first
+            lesson = await connection.fetchrow(
+                f"""
+                SELECT {LESSON_COLUMNS}
+                FROM module_lessons
+                WHERE course_id = $1 AND module_index = $2
+                """,
+                course_id, module_index
+            )
 
-async def generate_module_video(course_id: int, module_index: int, module_name: str, lesson_content: str):
+    return dict(lesson)
+
+def start_video_generation(course_id: int, module_index: int, module_name: str, lesson_content: str, priority: int = INTERACTIVE) -> asyncio.Task:
+    """Start generating a module video (for a learner, by default) unless this process is already generating it"""
+    if priority == INTERACTIVE and video_generations.in_flight((course_id, module_index)):
+        prioritize_video_generation(course_id, module_index)
+    return course_tasks.track(course_id, video_generations.start(
+        (course_id, module_index),
+        generate_module_video, course_id, module_index, module_name, lesson_content, priority
+    ))
+
+async def requeue_evicted_video(connection, course_id: int, module_index: int):
+    """Mark a video the storage manager evicted as pending again; returns the new lesson state, or None if it was not evicted"""
+    requeued = await connection.fetchrow(
+        """
+        UPDATE module_lessons
+        SET video_status = 'pending'
+        WHERE course_id = $1 AND module_index = $2 AND video_status = 'evicted'
+        RETURNING video_status, version, updated_at
+        """,
+        course_id, module_index
+    )
+    if requeued:
+        await notify_course_event(connection, course_id, "video_pending", module_index=module_index)
+    return requeued
+
+def prioritize_video_generation(course_id: int, module_index: int):
+    """A learner is waiting on a video this process is generating, possibly as a prefetch: render it at INTERACTIVE priority"""
+    render_scheduler.promote(lesson_job(course_id, module_index, FIRST_VIDEO_QUALITY), INTERACTIVE)
+
+def needs_upgrade(lesson) -> bool:
+    return lesson['video_status'] == 'completed' and lesson['video_quality'] == 'preview' and VIDEO_QUALITY != 'preview'
+
+def start_video_upgrade(course_id: int, module_index: int, module_name: str, lesson_content: str):
+    """Queue the full quality render of a lesson that only has a preview"""
+    course_tasks.track(course_id, video_upgrades.start(
+        (course_id, module_index),
+        upgrade_module_video, course_id, module_index, module_name, lesson_content
+    ))
+
+async def generate_module_video(course_id: int, module_index: int, module_name: str, lesson_content: str, priority: int = INTERACTIVE):
     """Background task to generate manim video for a module lesson"""
     db_pool = get_db_pool()
 
     try:
-        # Update status to generating
+        # Claim the pending video so only one worker (in any process) renders it
         async with db_pool.acquire() as connection:
-            await connection.execute(
+            claimed = await connection.fetchval(
                 """
                 UPDATE module_lessons
-                SET video_status = 'generating'
-                WHERE course_id = $1 AND module_index = $2
+                SET video_status = 'generating',
+                    audio_status = CASE WHEN audio_status = 'completed' THEN audio_status ELSE 'generating' END
+                WHERE course_id = $1 AND module_index = $2 AND video_status = 'pending'
+                RETURNING id
                 """,
                 course_id, module_index
             )
+            if not claimed:
+                print(f"ℹ️ Course {course_id}, Module {module_index}: Video already claimed, skipping")
+                return
+            await notify_course_event(connection, course_id, "video_generating", module_index=module_index)
 
         print(f"🎬 Course {course_id}, Module {module_index}: Starting video generation...")
 
         # Import and call manim video generator
         from utils.manim_generator import generate_manim_video
-        video_url = await generate_manim_video(course_id, module_index, module_name, lesson_content)
+        video = await generate_manim_video(
+            course_id, module_index, module_name, lesson_content, priority, FIRST_VIDEO_QUALITY,
+            on_narration=lambda narration_script: publish_narration_audio(course_id, module_index, narration_script)
+        )
 
         # Update with completed video
         async with db_pool.acquire() as connection:
             await connection.execute(
                 """
                 UPDATE module_lessons
-                SET video_url = $1, video_status = 'completed'
-                WHERE course_id = $2 AND module_index = $3
+                SET video_url = $1, video_status = 'completed', video_quality = $2, poster_url = $3, thumbnail_url = $4, render_stats = $7
+                WHERE course_id = $5 AND module_index = $6
                 """,
-                video_url, course_id, module_index
+                video['video_url'], FIRST_VIDEO_QUALITY, video['poster_url'], video['thumbnail_url'], course_id, module_index,
+                video['render_stats']
             )
+            await notify_course_event(connection, course_id, "video_completed", module_index=module_index, quality=FIRST_VIDEO_QUALITY)
+
+        print(f"✅ Course {course_id}, Module {module_index}: Video generated successfully ({FIRST_VIDEO_QUALITY})")
 
-        print(f"✅ Course {course_id}, Module {module_index}: Video generated successfully")
+        if FIRST_VIDEO_QUALITY != VIDEO_QUALITY:
+            start_video_upgrade(course_id, module_index, module_name, lesson_content)
 
     except Exception as e:
         print(f"❌ Course {course_id}, Module {module_index}: Failed to generate video: {e}")
@@ -395,17 +726,78 @@ async def generate_module_video(course_id: int, module_index: int, module_name:
             await connection.execute(
                 """
                 UPDATE module_lessons
-                SET video_status = 'error', video_error = $1
+                SET video_status = 'error', video_error = $1,
+                    -- Failed before the narration was written
+                    audio_status = CASE WHEN audio_status = 'generating' THEN 'error' ELSE audio_status END
                 WHERE course_id = $2 AND module_index = $3
                 """,
                 str(e), course_id, module_index
             )
+            await notify_course_event(connection, course_id, "video_error", module_index=module_index)
+    finally:
+        render_scheduler.finish_job(lesson_job(course_id, module_index, FIRST_VIDEO_QUALITY))
+
+async def publish_narration_audio(course_id: int, module_index: int, narration_script: str):
+    """Speak the narration and publish it as the lesson's audio while the video renders"""
+    db_pool = get_db_pool()
+    try:
+        from utils.manim_generator import synthesize_narration_audio
+        audio_url = await synthesize_narration_audio(course_id, module_index, narration_script)
+    except Exception as e:
+        print(f"⚠️ Course {course_id}, Module {module_index}: Failed to synthesize narration audio: {e}")
+        async with db_pool.acquire() as connection:
+            await connection.execute(
+                "UPDATE module_lessons SET audio_status = 'error' WHERE course_id = $1 AND module_index = $2",
+                course_id, module_index
+            )
+            await notify_course_event(connection, course_id, "audio_error", module_index=module_index)
+        return
+
+    async with db_pool.acquire() as connection:
+        await connection.execute(
+            """
+            UPDATE module_lessons
+            SET audio_url = $1, audio_status = 'completed'
+            WHERE course_id = $2 AND module_index = $3
+            """,
+            audio_url, course_id, module_index
+        )
+        await notify_course_event(connection, course_id, "audio_completed", module_index=module_index)
+    print(f"🔊 Course {course_id}, Module {module_index}: Narration audio published")
+
+async def upgrade_module_video(course_id: int, module_index: int, module_name: str, lesson_content: str):
+    """Background task to replace a preview video with a VIDEO_QUALITY render"""
+    try:
+        from utils.manim_generator import generate_manim_video
+        # Scene code is cached from the preview, so this is a render only
+        video = await generate_manim_video(course_id, module_index, module_name, lesson_content, UPGRADE, VIDEO_QUALITY)
+    except Exception as e:
+        # The preview stays published
+        failed_upgrades.add((course_id, module_index))
+        print(f"⚠️ Course {course_id}, Module {module_index}: Failed to upgrade video, keeping preview: {e}")
+        return
+
+    db_pool = get_db_pool()
+    async with db_pool.acquire() as connection:
+        # Skip if the lesson was reset for a retry while the upgrade rendered
+        upgraded = await connection.fetchval(
+            """
+            UPDATE module_lessons
+            SET video_url = $1, video_quality = $2, poster_url = $3, thumbnail_url = $4, render_stats = $7
+            WHERE course_id = $5 AND module_index = $6 AND video_status = 'completed' AND video_quality = 'preview'
+            RETURNING id
+            """,
+            video['video_url'], VIDEO_QUALITY, video['poster_url'], video['thumbnail_url'], course_id, module_index,
+            video['render_stats']
+        )
+        if upgraded:
+            await notify_course_event(connection, course_id, "video_upgraded", module_index=module_index, quality=VIDEO_QUALITY)
+            print(f"✅ Course {course_id}, Module {module_index}: Video upgraded to {VIDEO_QUALITY}")
 
 @router.post("/{course_id}/modules/{module_index}/retry-video")
 async def retry_video_generation(
     course_id: int,
     module_index: int,
-    background_tasks: BackgroundTasks,
     user: dict = Depends(verify_access_token)
 ):
     """Retry video generation for a failed module lesson"""
@@ -413,19 +805,20 @@ async def retry_video_generation(
 
     async with db_pool.acquire() as connection:
         # Get the module and lesson
-        course = await connection.fetchrow(
-            "SELECT modules FROM courses WHERE id = $1 AND user_id = $2",
-            course_id, user["user_id"]
+        module = await connection.fetchrow(
+            """
+            SELECT m.name
+            FROM courses c
+            LEFT JOIN course_modules m ON m.course_id = c.id AND m.module_index = $2
+            WHERE c.id = $1 AND c.user_id = $3
+            """,
+            course_id, module_index, user["user_id"]
         )
-        if not course:
+        if not module:
             raise HTTPException(status_code=404, detail="Course not found")
-
-        modules = json.loads(course['modules']) if course['modules'] else []
-        if module_index < 0 or module_index >= len(modules):
+        if module['name'] is None:
             raise HTTPException(status_code=404, detail="Module not found")
 
-        module = modules[module_index]
-
         # Check if lesson exists
         lesson = await connection.fetchrow(
             """
@@ -448,9 +841,11 @@ async def retry_video_generation(
             """,
             course_id, module_index
         )
+        await notify_course_event(connection, course_id, "video_pending", module_index=module_index)
 
-    # Schedule video generation in background
-    background_tasks.add_task(generate_module_video, course_id, module_index, module['name'], lesson['lesson_content'])
+    # Start video generation in background
+    failed_upgrades.discard((course_id, module_index))
+    start_video_generation(course_id, module_index, module['name'], lesson['lesson_content'])
 
     return {"detail": "Video generation queued for retry"}
 
@@ -465,61 +860,98 @@ async def delete_course(course_id: int, user: dict = Depends(verify_access_token
         )
         if result == "DELETE 0":
             raise HTTPException(status_code=404, detail="Course not found")
-        return {"detail": "Course deleted successfully"}
+        await notify_course_event(connection, course_id, "course_deleted")
+
+    # Stop summaries, module generation and renders (killing their manim and ffmpeg processes)
+    # before removing the files; other backend processes do the same on the course_deleted event
+    await course_tasks.cancel_course(course_id)
+    await remove_course_videos(course_id)
+    return {"detail": "Course deleted successfully"}
 
 # Public endpoints (no authentication required) for shared content
 
-@router.get("/public/{course_id}")
-async def get_course_public(course_id: int):
-    """Get course by ID (public - no authentication required)"""
+def public_response(request: Request, cached: dict) -> Response:
+    """Serve a cached public response, or a 304 if the client already has it"""
+    if is_not_modified(request, cached["headers"]["ETag"], cached["last_modified"]):
+        return not_modified(cached["headers"])
+    return Response(content=cached["body"], media_type="application/json", headers=cached["headers"])
+
+
+async def load_course_public(course_id: int) -> dict:
     db_pool = get_db_pool()
     async with db_pool.acquire() as connection:
         course = await connection.fetchrow(
-            "SELECT * FROM courses WHERE id = $1",
+            f"SELECT c.*, {MODULES_JSON_SQL} AS modules FROM courses c WHERE c.id = $1",
             course_id
         )
-        if not course:
-            raise HTTPException(status_code=404, detail="Course not found")
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
 
-        course_dict = dict(course)
-        # Parse modules JSON string to array
-        if course_dict.get('modules'):
-            course_dict['modules'] = json.loads(course_dict['modules'])
+    return {
+        "body": orjson.dumps(dict(course)),
+        "headers": cache_headers(make_etag("course", course_id, course['version']), course['updated_at'], PUBLIC_CACHE_CONTROL),
+        "last_modified": course['updated_at'],
+    }
 
-        return course_dict
 
-@router.get("/public/{course_id}/modules/{module_index}/lesson")
-async def get_module_lesson_public(
-    course_id: int,
-    module_index: int
-):
-    """Get lesson for a specific module (public - no authentication required)"""
+async def load_module_lesson_public(course_id: int, module_index: int) -> dict:
     db_pool = get_db_pool()
-
     async with db_pool.acquire() as connection:
-        # Check if course exists and get the module
-        course = await connection.fetchrow(
-            "SELECT modules FROM courses WHERE id = $1",
-            course_id
-        )
-        if not course:
-            raise HTTPException(status_code=404, detail="Course not found")
-
-        modules = json.loads(course['modules']) if course['modules'] else []
-        if module_index < 0 or module_index >= len(modules):
-            raise HTTPException(status_code=404, detail="Module not found")
-
-        # Check if lesson exists
         lesson = await connection.fetchrow(
             """
-            SELECT lesson_content, video_url, video_status, video_error
-            FROM module_lessons
-            WHERE course_id = $1 AND module_index = $2
+            SELECT
+                m.module_index, m.name AS module_name,
+                l.lesson_content, l.video_url, l.video_status, l.video_error, l.video_quality,
+                l.audio_url, l.audio_status, l.poster_url, l.thumbnail_url, l.version, l.updated_at
+            FROM courses c
+            LEFT JOIN course_modules m ON m.course_id = c.id AND m.module_index = $2
+            LEFT JOIN module_lessons l ON l.course_id = c.id AND l.module_index = $2
+            WHERE c.id = $1
             """,
             course_id, module_index
         )
+    if not lesson:
+        raise HTTPException(status_code=404, detail="Course not found")
+    if lesson['module_index'] is None:
+        raise HTTPException(status_code=404, detail="Module not found")
+    if lesson['version'] is None:
+        raise HTTPException(status_code=404, detail="Lesson not available yet")
+    if lesson['video_status'] == 'evicted':
+        async with db_pool.acquire() as connection:
+            requeued = await requeue_evicted_video(connection, course_id, module_index)
+        if requeued:
+            start_video_generation(course_id, module_index, lesson['module_name'], lesson['lesson_content'])
+        return await load_module_lesson_public(course_id, module_index)
 
-        if not lesson:
-            raise HTTPException(status_code=404, detail="Lesson not available yet")
+    return {
+        "body": orjson.dumps(lesson_body(lesson)),
+        "headers": cache_headers(make_etag("lesson", course_id, module_index, lesson['version']), lesson['updated_at'], PUBLIC_CACHE_CONTROL),
+        "last_modified": lesson['updated_at'],
+    }
+
+
+@router.get("/public/{course_id}")
+async def get_course_public(course_id: int, request: Request):
+    """Get course by ID (public - no authentication required)"""
+    cached = await public_cache.get_or_load(
+        ("course", course_id),
+        lambda: load_course_public(course_id)
+    )
+    return public_response(request, cached)
 
-        return dict(lesson)
\ No newline at end of file
+@router.get("/public/{course_id}/modules/{module_index}/lesson")
+async def get_module_lesson_public(
+    course_id: int,
+    module_index: int,
+    request: Request
+):
+    """Get lesson for a specific module (public - no authentication required)"""
+    if video_generations.in_flight((course_id, module_index)):
+        prioritize_video_generation(course_id, module_index)
+    cached = await public_cache.get_or_load(
+        ("lesson", course_id, module_index),
+        lambda: load_module_lesson_public(course_id, module_index)
+    )
+    # Only once the lesson is known to exist, so made-up ids can't grow the pending views
+    record_access(course_id, module_index)
+    return public_response(request, cached)
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends
+from api.auth import verify_access_token
+from api.course import public_cache
+from api.chat import chat_prompts, chat_metrics
+from utils.render_scheduler import render_scheduler
+from utils.manim_generator import stage_metrics
+from utils.render_sandbox import sandbox_metrics
+from utils.storage_manager import storage_stats
+from utils.task_registry import course_tasks
+
+router = APIRouter(prefix="/metrics")
+
+
+@router.get("/")
+async def get_metrics(user: dict = Depends(verify_access_token)):
+    """Get in-process render queue, render usage, background task, chat, cache and storage metrics"""
+    return {
+        "renders": render_scheduler.metrics(),
+        "course_tasks": course_tasks.metrics(),
+        "video_stages": stage_metrics(),
+        "render_usage": sandbox_metrics(),
+        "public_cache": public_cache.stats(),
+        "chat_prompts": chat_prompts.stats(),
+        "chat": chat_metrics(),
+        "storage": storage_stats(),
+    }
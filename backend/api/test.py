@@ -1,8 +1,9 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from pydantic import BaseModel
 from typing import List
 from database import get_db_pool
 from api.auth import verify_access_token
+from utils.http_cache import make_etag, cache_headers, is_not_modified, not_modified
 
 router = APIRouter(prefix="/tests")
 
@@ -17,18 +18,28 @@ class TestSubmission(BaseModel):
 
 
 @router.get("/{course_id}/questions")
-async def get_test_questions(course_id: int, user: dict = Depends(verify_access_token)):
+async def get_test_questions(
+    course_id: int,
+    request: Request,
+    response: Response,
+    user: dict = Depends(verify_access_token)
+):
     """Get all knowledge test questions for a course"""
     db_pool = get_db_pool()
     async with db_pool.acquire() as connection:
-        # Check if course exists
+        # Check if course exists (questions only change when the course version does)
         course = await connection.fetchrow(
-            "SELECT id FROM courses WHERE id = $1",
+            "SELECT id, version, updated_at FROM courses WHERE id = $1",
             course_id
         )
         if not course:
             raise HTTPException(status_code=404, detail="Course not found")
 
+        headers = cache_headers(make_etag("questions", course_id, course['version']), course['updated_at'])
+        if is_not_modified(request, headers["ETag"], course['updated_at']):
+            return not_modified(headers)
+        response.headers.update(headers)
+
         # Fetch all questions with their options
         questions = await connection.fetch(
             """
@@ -248,19 +259,26 @@ async def get_test_status(course_id: int, user: dict = Depends(verify_access_tok
 async def get_module_test_questions(
     course_id: int,
     module_index: int,
+    request: Request,
+    response: Response,
     user: dict = Depends(verify_access_token)
 ):
     """Get all knowledge test questions for a specific module"""
     db_pool = get_db_pool()
     async with db_pool.acquire() as connection:
-        # Check if course exists
+        # Check if course exists (questions only change when the course version does)
         course = await connection.fetchrow(
-            "SELECT id FROM courses WHERE id = $1",
+            "SELECT id, version, updated_at FROM courses WHERE id = $1",
             course_id
         )
         if not course:
             raise HTTPException(status_code=404, detail="Course not found")
 
+        headers = cache_headers(make_etag("questions", course_id, module_index, course['version']), course['updated_at'])
+        if is_not_modified(request, headers["ETag"], course['updated_at']):
+            return not_modified(headers)
+        response.headers.update(headers)
+
         # Fetch questions for this specific module
         questions = await connection.fetch(
             """
@@ -0,0 +1,194 @@
+"""
+Benchmark time to first token of AI coach conversations with and without prompt caching
+
+Runs a multi-turn conversation about one module through api.chat.stream_reply
+against a local stand-in for the Anthropic Messages API (ANTHROPIC_BASE_URL).
+The stand-in streams like the real API, keeps a prompt cache keyed by
+the prefixes up to each cache_control breakpoint, and waits before the first
+token in proportion to the input tokens it did not read from that cache.
+It reports cache reads and writes in usage the way the real API does.
+
+    uncached   CHAT_PROMPT_CACHING off: every turn processes the whole prompt
+    cached     CHAT_PROMPT_CACHING on: breakpoints on the system prompt and newest message
+
+Reports time to first token of the first and the follow-up turns, and the
+token usage recorded by api.chat.
+
+Usage:
+    python benchmarks/chat_prompt_cache.py [--turns 6] [--content-kb 24] [--prefill-ms-per-1k 80]
+"""
+import os
+import sys
+import time
+import json
+import socket
+import asyncio
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Shortest prefix the API caches for Sonnet models, in tokens
+MIN_CACHEABLE_TOKENS = 1024
+REPLY = (
+    "💡 Think of it this way: each step moves the parameters a little against the gradient. "
+    "If the learning rate is too large the steps overshoot, and if it is too small progress is slow. "
+    "🎯 Try one update by hand with a learning rate of 0.1 and see where you land."
+)
+
+
+def count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def stand_in_api(prefill_ms_per_1k: float, cached_ms_per_1k: float, base_ms: float) -> Starlette:
+    """Streaming /v1/messages with a prompt cache of every prefix ending at a breakpoint"""
+    cache: set[str] = set()
+
+    def blocks(body: dict) -> list[dict]:
+        """The prompt as a list of content blocks, in the order the API caches them"""
+        system = body.get("system") or []
+        if isinstance(system, str):
+            system = [{"type": "text", "text": system}]
+        result = [{"role": "system", **block} for block in system]
+        for message in body["messages"]:
+            content = message["content"]
+            if isinstance(content, str):
+                content = [{"type": "text", "text": content}]
+            result.extend({"role": message["role"], **block} for block in content)
+        return result
+
+    def prefix_key(prompt: list[dict], length: int) -> str:
+        prefix = [(block["role"], block["text"]) for block in prompt[:length]]
+        return hashlib.sha256(json.dumps(prefix).encode()).hexdigest()
+
+    async def messages(request: Request):
+        body = await request.json()
+        prompt = blocks(body)
+        tokens = [count_tokens(block["text"]) for block in prompt]
+
+        # Longest earlier breakpoint prefix this prompt starts with
+        read_blocks = next((length for length in range(len(prompt), 0, -1) if prefix_key(prompt, length) in cache), 0)
+        read = sum(tokens[:read_blocks])
+        breakpoints = [index + 1 for index, block in enumerate(prompt) if "cache_control" in block]
+        written = 0
+        for length in breakpoints:
+            if sum(tokens[:length]) >= MIN_CACHEABLE_TOKENS and prefix_key(prompt, length) not in cache:
+                cache.add(prefix_key(prompt, length))
+                written = max(written, sum(tokens[:length]) - read)
+        uncached = sum(tokens) - read - written
+
+        usage = {"input_tokens": uncached, "output_tokens": 1, "cache_read_input_tokens": read, "cache_creation_input_tokens": written}
+        prefill_seconds = (base_ms + (uncached + written) / 1000 * prefill_ms_per_1k + read / 1000 * cached_ms_per_1k) / 1000
+
+        def event(name: str, data: dict) -> str:
+            return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+        async def stream():
+            yield event("message_start", {"type": "message_start", "message": {
+                "id": "msg_stand_in", "type": "message", "role": "assistant", "model": body["model"],
+                "content": [], "stop_reason": None, "stop_sequence": None, "usage": usage,
+            }})
+            await asyncio.sleep(prefill_seconds)
+            yield event("content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+            words = REPLY.split(" ")
+            for index, word in enumerate(words):
+                text = word if index == 0 else f" {word}"
+                yield event("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": text}})
+                await asyncio.sleep(0.002)
+            yield event("content_block_stop", {"type": "content_block_stop", "index": 0})
+            yield event("message_delta", {
+                "type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                "usage": {"output_tokens": count_tokens(REPLY)},
+            })
+            yield event("message_stop", {"type": "message_stop"})
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return Starlette(routes=[Route("/v1/messages", messages, methods=["POST"])])
+
+
+def start_server(app) -> tuple[uvicorn.Server, threading.Thread, int]:
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, port
+
+
+async def converse(chat, system_message: str, turns: int) -> list[float]:
+    """Ask turns questions in one conversation; returns time to first token per turn"""
+    messages = []
+    first_token_seconds = []
+    for turn in range(turns):
+        messages.append({"role": "user", "content": f"Question {turn + 1}: can you explain the part about the learning rate again?"})
+        started = time.perf_counter()
+        reply = []
+        async for text in chat.stream_reply(system_message, list(messages)):
+            if not reply:
+                first_token_seconds.append(time.perf_counter() - started)
+            reply.append(text)
+        messages.append({"role": "assistant", "content": "".join(reply)})
+    return first_token_seconds
+
+
+async def run_cases(chat, system_message: str, turns: int):
+    # One event loop for every case: the client's pooled connections belong to it
+    for name, caching in (("uncached", False), ("cached", True)):
+        chat.CHAT_PROMPT_CACHING = caching
+        for key in chat.chat_usage:
+            chat.chat_usage[key] = 0
+        first_token_seconds = await converse(chat, system_message, turns)
+        follow_ups = first_token_seconds[1:]
+        usage = chat.chat_metrics()
+        print(
+            f"{name:<12}{first_token_seconds[0] * 1000:>10.0f}{sum(follow_ups) / len(follow_ups) * 1000:>14.0f}"
+            f"{usage['input_tokens']:>11}{usage['cache_read_input_tokens']:>12}{usage['cache_creation_input_tokens']:>13}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=6, help="questions per conversation (at least 2)")
+    parser.add_argument("--content-kb", type=int, default=24, help="size of the module content in the system prompt")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=80, help="stand-in latency per 1k uncached input tokens")
+    parser.add_argument("--cached-ms-per-1k", type=float, default=4, help="stand-in latency per 1k tokens read from the cache")
+    parser.add_argument("--base-ms", type=float, default=150, help="stand-in latency of every request")
+    args = parser.parse_args()
+
+    server, thread, port = start_server(stand_in_api(args.prefill_ms_per_1k, args.cached_ms_per_1k, args.base_ms))
+    os.environ["ANTHROPIC_BASE_URL"] = f"http://127.0.0.1:{port}"
+    os.environ["ANTHROPIC_API_KEY"] = "stand-in"
+    from api import chat  # noqa: E402 (reads ANTHROPIC_BASE_URL on import)
+
+    paragraph = "Gradient descent iteratively updates parameters against the loss gradient, scaled by the learning rate. "
+    content = (paragraph * (args.content_kb * 1024 // len(paragraph) + 1))[:args.content_kb * 1024]
+    system_message = chat.build_system_prompt("Machine Learning", "Gradient Descent", content)
+    print(f"Input: {count_tokens(system_message)} token system prompt, {args.turns} turns\n")
+    print(f"{'case':<12}{'first ms':>10}{'follow-up ms':>14}{'input tok':>11}{'cache read':>12}{'cache write':>13}")
+
+    try:
+        asyncio.run(run_cases(chat, system_message, args.turns))
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+if __name__ == "__main__":
+    main()
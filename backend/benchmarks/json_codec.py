@@ -0,0 +1,93 @@
+"""
+Benchmark JSON serialization cost for large course module payloads
+
+Compares the stdlib json module against orjson for the two hot paths:
+decoding the jsonb modules array read from Postgres, and rendering the
+course response body returned by FastAPI.
+
+Usage:
+    python benchmarks/json_codec.py [--courses 20] [--modules 8] [--content-kb 12]
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import orjson
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from database import encode_json  # noqa: E402
+
+
+def build_courses(course_count: int, module_count: int, content_kb: int) -> list[dict]:
+    """Build course dicts shaped like GET /api/courses responses"""
+    paragraph = "Gradient descent iteratively updates parameters against the loss gradient. "
+    content = (paragraph * (content_kb * 1024 // len(paragraph) + 1))[:content_kb * 1024]
+    return [
+        {
+            "id": course_id,
+            "user_id": 1,
+            "name": f"Course {course_id}",
+            "code": f"C{course_id:04d}",
+            "description": "A generated course used for benchmarking",
+            "modules_status": "completed",
+            "modules_error": None,
+            "modules": [
+                {"name": f"Module {module_index + 1}", "content": content}
+                for module_index in range(module_count)
+            ],
+        }
+        for course_id in range(course_count)
+    ]
+
+
+def measure(fn, repeat: int) -> float:
+    """Best-of-3 mean milliseconds per call"""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=20)
+    parser.add_argument("--modules", type=int, default=8)
+    parser.add_argument("--content-kb", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    courses = build_courses(args.courses, args.modules, args.content_kb)
+    modules = courses[0]["modules"]
+    modules_text = json.dumps(modules)
+    listing_bytes = len(orjson.dumps(courses))
+
+    print(f"Payload: {args.courses} courses x {args.modules} modules x {args.content_kb} KB "
+          f"({listing_bytes / 1024 / 1024:.2f} MB listing, {len(modules_text) / 1024:.0f} KB per modules array)\n")
+
+    # Pre-encode once so the decode cases time decoding only
+    encoded_listing = [json.dumps(course["modules"]) for course in courses]
+
+    cases = [
+        ("decode modules (jsonb -> list)", lambda: json.loads(modules_text), lambda: orjson.loads(modules_text)),
+        ("encode modules (list -> jsonb)", lambda: json.dumps(modules), lambda: encode_json(modules)),
+        ("decode listing (all courses)",
+         lambda: [json.loads(text) for text in encoded_listing],
+         lambda: [orjson.loads(text) for text in encoded_listing]),
+        ("render listing response", lambda: JSONResponse(courses).body, lambda: ORJSONResponse(courses).body),
+    ]
+
+    print(f"{'case':<34}{'stdlib ms':>12}{'orjson ms':>12}{'speedup':>10}")
+    for name, stdlib_fn, orjson_fn in cases:
+        stdlib_ms = measure(stdlib_fn, args.repeat)
+        orjson_ms = measure(orjson_fn, args.repeat)
+        print(f"{name:<34}{stdlib_ms:>12.3f}{orjson_ms:>12.3f}{stdlib_ms / orjson_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
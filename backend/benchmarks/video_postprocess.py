@@ -0,0 +1,132 @@
+"""
+Benchmark post-processing time per lesson video
+
+Renders synthetic section videos shaped like manim -ql output (854x480,
+15 fps, H.264 + AAC) and times what happens between "manim finished" and
+"video is ready to serve":
+
+    legacy   concat -c copy, then a crop re-encode of the joined video
+    remux    finalize_video: one concat/remux pass with +faststart (default)
+    crop     finalize_video with VIDEO_CROP set: one pass, crop re-encode
+
+Both finalize_video cases include its poster frame and thumbnail sprite.
+
+Also reports whether the moov atom lands before mdat (faststart).
+
+Requires ffmpeg on PATH (or --ffmpeg).
+
+Usage:
+    python benchmarks/video_postprocess.py [--sections 4] [--seconds 12] [--repeat 3]
+"""
+import os
+import sys
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("ANTHROPIC_API_KEY", "unused")  # The module builds a client at import time
+from utils import manim_generator  # noqa: E402
+
+LEGACY_CROP = "iw-3:ih-2:2:1"
+
+
+def run(*args: str):
+    subprocess.run(args, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def make_sections(ffmpeg: str, work_dir: Path, sections: int, seconds: int) -> list[Path]:
+    videos = []
+    for index in range(sections):
+        video = work_dir / f"Section{index + 1}.mp4"
+        run(
+            ffmpeg, "-f", "lavfi", "-i", f"testsrc2=size=854x480:rate=15:duration={seconds}",
+            "-f", "lavfi", "-i", f"sine=frequency={300 + index * 100}:duration={seconds}",
+            "-c:v", "libx264", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", "-y", str(video)
+        )
+        videos.append(video)
+    return videos
+
+
+def legacy_postprocess(ffmpeg: str, videos: list[Path], output: Path, work_dir: Path):
+    """What execute_manim_code did before: stream-copy concat, then crop with a full re-encode"""
+    concat_list = work_dir / "legacy.txt"
+    concat_list.write_text("".join(f"file '{video.resolve()}'\n" for video in videos))
+    joined = work_dir / "legacy_joined.mp4"
+    run(ffmpeg, "-f", "concat", "-safe", "0", "-i", str(concat_list), "-c", "copy", "-y", str(joined))
+    run(ffmpeg, "-i", str(joined), "-vf", f"crop={LEGACY_CROP}", "-c:a", "copy", "-y", str(output))
+
+
+def finalize(videos: list[Path], output: Path, work_dir: Path, crop: str):
+    manim_generator.VIDEO_CROP = crop
+    asyncio.run(manim_generator.finalize_video(videos, output, work_dir))
+
+
+def top_level_atoms(path: Path) -> list[str]:
+    atoms = []
+    with open(path, "rb") as f:
+        while header := f.read(8):
+            size = int.from_bytes(header[:4], "big")
+            atoms.append(header[4:8].decode("latin-1"))
+            if size == 1:
+                size = int.from_bytes(f.read(8), "big") - 8
+            elif size == 0:
+                break
+            f.seek(size - 8, os.SEEK_CUR)
+    return atoms
+
+
+def is_faststart(path: Path) -> bool:
+    atoms = top_level_atoms(path)
+    return "moov" in atoms and "mdat" in atoms and atoms.index("moov") < atoms.index("mdat")
+
+
+def measure(fn, repeat: int) -> float:
+    """Best-of-repeat seconds per call"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=4)
+    parser.add_argument("--seconds", type=int, default=12, help="length of each section")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--ffmpeg", default="ffmpeg")
+    args = parser.parse_args()
+
+    ffmpeg = shutil.which(args.ffmpeg)
+    if ffmpeg is None:
+        sys.exit(f"ffmpeg not found: {args.ffmpeg}")
+    # finalize_video runs "ffmpeg" from PATH
+    os.environ["PATH"] = str(Path(ffmpeg).parent) + os.pathsep + os.environ["PATH"]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work_dir = Path(temp_dir)
+        videos = make_sections(ffmpeg, work_dir, args.sections, args.seconds)
+        print(f"Input: {args.sections} sections x {args.seconds}s at 854x480@15fps\n")
+
+        cases = [
+            ("legacy (concat + crop re-encode)", lambda output: legacy_postprocess(ffmpeg, videos, output, work_dir)),
+            ("remux (concat + faststart)", lambda output: finalize(videos, output, work_dir, "")),
+            ("crop (single pass + faststart)", lambda output: finalize(videos, output, work_dir, LEGACY_CROP)),
+        ]
+
+        print(f"{'case':<36}{'seconds':>10}{'MB':>8}{'faststart':>11}")
+        for name, fn in cases:
+            output = work_dir / f"{name.split()[0]}.mp4"
+            seconds = measure(lambda: fn(output), args.repeat)
+            size_mb = output.stat().st_size / 1024 / 1024
+            print(f"{name:<36}{seconds:>10.3f}{size_mb:>8.2f}{'yes' if is_faststart(output) else 'no':>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark concurrent, seek-heavy video playback against a real uvicorn server
+
+Serves one synthetic video file two ways and has every simulated viewer
+seek around it with byte-range requests, the way a <video> element does
+when a learner scrubs through a lesson:
+
+    static   plain StaticFiles (64 KiB reads, mtime ETag, no Cache-Control)
+    video    utils.video_files.VideoFiles (VIDEO_CHUNK_SIZE reads, immutable, digest ETag)
+
+Reports requests/s, MB/s and latency percentiles per case.
+
+Usage:
+    python benchmarks/video_range_serving.py [--viewers 32] [--seeks 40] [--size-mb 64]
+"""
+import os
+import sys
+import time
+import socket
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.staticfiles import StaticFiles
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from utils import render_cache  # noqa: E402
+from utils.video_files import VideoFiles, VIDEO_CHUNK_SIZE  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(app) -> tuple[uvicorn.Server, threading.Thread, int]:
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, port
+
+
+async def viewer(client: httpx.AsyncClient, url: str, size: int, seeks: int, rng: random.Random, latencies: list[float]) -> int:
+    """One player: a first range from the start, then random seeks reading 256 KiB-2 MiB each"""
+    received = 0
+    start = 0
+    for seek in range(seeks):
+        length = rng.randint(256 * 1024, 2 * 1024 * 1024)
+        end = min(start + length, size) - 1
+        started = time.perf_counter()
+        response = await client.get(url, headers={"Range": f"bytes={start}-{end}"})
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 206, response.status_code
+        received += len(response.content)
+        start = rng.randrange(0, size - 1)
+    return received
+
+
+async def run_case(port: int, file_name: str, size: int, viewers: int, seeks: int) -> dict:
+    url = f"http://127.0.0.1:{port}/videos/{file_name}"
+    latencies: list[float] = []
+    limits = httpx.Limits(max_connections=viewers, max_keepalive_connections=viewers)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        head = await client.get(url, headers={"Range": "bytes=0-0"})
+        started = time.perf_counter()
+        received = await asyncio.gather(*(
+            viewer(client, url, size, seeks, random.Random(index), latencies) for index in range(viewers)
+        ))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests_per_second": len(latencies) / elapsed,
+        "mb_per_second": sum(received) / 1024 / 1024 / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+        "cache_control": head.headers.get("cache-control", "-"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--viewers", type=int, default=32, help="concurrent players")
+    parser.add_argument("--seeks", type=int, default=40, help="range requests per player")
+    parser.add_argument("--size-mb", type=int, default=64, help="size of the synthetic video")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        video_dir = Path(temp_dir)
+        draft = video_dir / "draft.mp4"
+        draft.write_bytes(os.urandom(args.size_mb * 1024 * 1024))
+        video = draft.rename(video_dir / f"0-medium-{render_cache.file_digest(draft)[:12]}.mp4")
+        size = video.stat().st_size
+
+        cases = [
+            ("static (StaticFiles)", StaticFiles(directory=video_dir)),
+            (f"video (VideoFiles, {VIDEO_CHUNK_SIZE // 1024} KiB reads)", VideoFiles(directory=video_dir)),
+        ]
+        print(f"Input: {args.size_mb} MB file, {args.viewers} viewers x {args.seeks} seeks\n")
+        print(f"{'case':<40}{'req/s':>9}{'MB/s':>9}{'p50 ms':>9}{'p95 ms':>9}  cache-control")
+        for name, files in cases:
+            app = Starlette()
+            app.mount("/videos", files)
+            server, thread, port = start_server(app)
+            try:
+                result = asyncio.run(run_case(port, video.name, size, args.viewers, args.seeks))
+            finally:
+                server.should_exit = True
+                thread.join()
+            print(
+                f"{name:<40}{result['requests_per_second']:>9.0f}{result['mb_per_second']:>9.0f}"
+                f"{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}  {result['cache_control']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import os
 import asyncpg
 import bcrypt
+import orjson
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -24,18 +25,39 @@ async def reset_db():
         """)
     await init_db()
     print("✅ Database reset successfully")
+def get_db_config() -> dict:
+    """Connection parameters shared by the pool and dedicated connections"""
+    return {
+        "host": os.getenv("POSTGRES_HOST", "postgres"),
+        "port": int(os.getenv("POSTGRES_PORT", "5432")),
+        "user": os.getenv("POSTGRES_USER", "postgres"),
+        "password": os.getenv("POSTGRES_PASSWORD", ""),
+        "database": os.getenv("POSTGRES_DB", "postgres"),
+    }
+
+def encode_json(value) -> str:
+    """Serialize a Python value for a json/jsonb parameter"""
+    return orjson.dumps(value).decode()
+
+async def init_connection(connection: asyncpg.Connection):
+    """Decode json/jsonb columns to Python objects with orjson on every pooled connection"""
+    for type_name in ("json", "jsonb"):
+        await connection.set_type_codec(
+            type_name,
+            encoder=encode_json,
+            decoder=orjson.loads,
+            schema="pg_catalog",
+        )
+
 async def init_db_pool():
     """Initialize the database connection pool"""
     global db_pool
     try:
         db_pool = await asyncpg.create_pool(
-            host=os.getenv("POSTGRES_HOST", "postgres"),
-            port=int(os.getenv("POSTGRES_PORT", "5432")),
-            user=os.getenv("POSTGRES_USER", "postgres"),
-            password=os.getenv("POSTGRES_PASSWORD", ""),
-            database=os.getenv("POSTGRES_DB", "postgres"),
+            **get_db_config(),
             min_size=1,
             max_size=10,
+            init=init_connection,
         )
         print("✅ Database connection pool created successfully")
     except Exception as e:
@@ -73,6 +95,78 @@ async def init_demo_user():
             )
             print("✅ Demo user created (test@test.com / testing)")
 
+async def migrate_course_modules(connection: asyncpg.Connection):
+    """Move modules out of the legacy courses.modules JSONB column into course_modules"""
+    has_legacy_column = await connection.fetchval(
+        """
+        SELECT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = 'courses' AND column_name = 'modules'
+        )
+        """
+    )
+    if not has_legacy_column:
+        return
+
+    async with connection.transaction():
+        migrated = await connection.execute("""
+            INSERT INTO course_modules (course_id, module_index, name, content)
+            SELECT c.id, m.ordinality - 1, m.module->>'name', m.module->>'content'
+            FROM courses c
+            CROSS JOIN LATERAL jsonb_array_elements(c.modules) WITH ORDINALITY AS m(module, ordinality)
+            WHERE jsonb_typeof(c.modules) = 'array'
+            ON CONFLICT (course_id, module_index) DO NOTHING
+        """)
+        await connection.execute("ALTER TABLE courses DROP COLUMN modules")
+    print(f"✅ Migrated course modules to course_modules table ({migrated})")
+
+async def migrate_module_lessons(connection: asyncpg.Connection):
+    """Add module_lessons columns introduced after the table was first created"""
+    has_quality_column = await connection.fetchval(
+        """
+        SELECT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = 'module_lessons' AND column_name = 'video_quality'
+        )
+        """
+    )
+    if not has_quality_column:
+        await connection.execute("ALTER TABLE module_lessons ADD COLUMN video_quality VARCHAR(20)")
+        # Every video rendered before quality tiers existed was a -ql render
+        await connection.execute("UPDATE module_lessons SET video_quality = 'low' WHERE video_status = 'completed'")
+    await connection.execute("""
+        ALTER TABLE module_lessons
+            ADD COLUMN IF NOT EXISTS audio_url TEXT,
+            ADD COLUMN IF NOT EXISTS audio_status VARCHAR(50),
+            ADD COLUMN IF NOT EXISTS poster_url TEXT,
+            ADD COLUMN IF NOT EXISTS thumbnail_url TEXT,
+            ADD COLUMN IF NOT EXISTS render_stats JSONB
+    """)
+
+async def init_version_tracking(connection: asyncpg.Connection):
+    """Bump version/updated_at on every write to courses and module_lessons (used for ETags)"""
+    for table in ("courses", "module_lessons"):
+        await connection.execute(f"""
+            ALTER TABLE {table}
+                ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1,
+                ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        """)
+    await connection.execute("""
+        CREATE OR REPLACE FUNCTION bump_row_version() RETURNS TRIGGER AS $$
+        BEGIN
+            NEW.version := OLD.version + 1;
+            NEW.updated_at := CURRENT_TIMESTAMP;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table in ("courses", "module_lessons"):
+        await connection.execute(f"""
+            CREATE OR REPLACE TRIGGER {table}_bump_version
+            BEFORE UPDATE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION bump_row_version()
+        """)
+
 async def init_db():
         db_pool = get_db_pool()
         async with db_pool.acquire() as connection:
@@ -92,12 +186,28 @@ async def init_db():
                     name VARCHAR(255) NOT NULL,
                     code VARCHAR(50) UNIQUE NOT NULL,
                     description TEXT,
-                    modules JSONB,
                     modules_status VARCHAR(50) DEFAULT 'pending',
                     modules_error TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    version INTEGER NOT NULL DEFAULT 1,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
+            await connection.execute("""
+                CREATE INDEX IF NOT EXISTS idx_courses_user_id ON courses (user_id, id)
+            """)
+            await connection.execute("""
+                CREATE TABLE IF NOT EXISTS course_modules (
+                    id SERIAL PRIMARY KEY,
+                    course_id INTEGER NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+                    module_index INTEGER NOT NULL,
+                    name TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(course_id, module_index)
+                )
+            """)
+            await migrate_course_modules(connection)
             await connection.execute("""
                 CREATE TABLE IF NOT EXISTS course_pdfs (
                     id SERIAL PRIMARY KEY,
@@ -154,10 +264,31 @@ async def init_db():
                     video_url TEXT,
                     video_status VARCHAR(50) DEFAULT 'pending',
                     video_error TEXT,
+                    video_quality VARCHAR(20),
+                    audio_url TEXT,
+                    audio_status VARCHAR(50),
+                    poster_url TEXT,
+                    thumbnail_url TEXT,
+                    render_stats JSONB,
+                    version INTEGER NOT NULL DEFAULT 1,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     UNIQUE(course_id, module_index)
                 )
             """)
+            await migrate_module_lessons(connection)
+            # Kept out of module_lessons so recording a view doesn't bump the lesson's version (ETag)
+            await connection.execute("""
+                CREATE TABLE IF NOT EXISTS video_storage (
+                    course_id INTEGER NOT NULL,
+                    module_index INTEGER NOT NULL,
+                    video_bytes BIGINT,
+                    accessed_at TIMESTAMP,
+                    PRIMARY KEY (course_id, module_index),
+                    FOREIGN KEY (course_id, module_index) REFERENCES module_lessons(course_id, module_index) ON DELETE CASCADE
+                )
+            """)
+            await init_version_tracking(connection)
         print("✅ Database initialized successfully")
 
         # Create demo user after tables are created
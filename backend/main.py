@@ -1,20 +1,30 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 from pathlib import Path
 from database import init_db_pool, close_db_pool, init_db, reset_db
-from api import example, auth, course, test, chat, leaderboard
+from utils.course_events import start_event_listener, stop_event_listener
+from utils.storage_manager import start_storage_sweeper, stop_storage_sweeper
+from utils.video_files import VideoFiles
+from utils.manim_generator import start_renderer_warm_up, stop_renderer_warm_up
+from api import example, auth, course, test, chat, leaderboard, metrics
 import os
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db_pool() # Startup: Create database connection pool
     await init_db() # Initialize database tables if they don't exist
+    await start_event_listener() # Fan out course progress events to SSE subscribers
+    start_storage_sweeper() # Clean up and cap video storage in the background
+    start_renderer_warm_up() # First template render happens before a learner waits on it
     yield
+    await stop_renderer_warm_up()
+    await stop_storage_sweeper()
+    await stop_event_listener()
     await close_db_pool() # Shutdown: Close database connection pool
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Configure CORS with specific origins
 allowed_origins = os.getenv("CORS_ORIGINS", "http://localhost:8080").split(",")
@@ -24,6 +34,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["Content-Type", "Authorization"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 @app.get("/")
@@ -37,11 +48,12 @@ app.include_router(course.router, prefix="/api")
 app.include_router(test.router, prefix="/api")
 app.include_router(chat.router, prefix="/api")
 app.include_router(leaderboard.router, prefix="/api")
+app.include_router(metrics.router, prefix="/api")
 
 # Create static directory if it doesn't exist
 static_dir = Path("static")
 static_dir.mkdir(exist_ok=True)
 (static_dir / "videos").mkdir(exist_ok=True)
 
-# Mount static files for serving videos
-app.mount("/videos", StaticFiles(directory="static/videos"), name="videos")
\ No newline at end of file
+# Mount static files for serving videos (content-hashed names are cached as immutable)
+app.mount("/videos", VideoFiles(directory="static/videos"), name="videos")
\ No newline at end of file
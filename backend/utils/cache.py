@@ -0,0 +1,92 @@
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+from utils.singleflight import SingleFlight
+
+
+class TTLCache:
+    """Bounded LRU mapping whose entries optionally expire after ttl seconds"""
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            return default
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        self.entries[key] = (expires_at, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        self.entries.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches predicate"""
+        keys = [key for key in self.entries if predicate(key)]
+        for key in keys:
+            del self.entries[key]
+        return len(keys)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class ResponseCache:
+    """
+    Shared cache of rendered responses scoped by course
+
+    Keys are tuples whose second element is the course_id, e.g.
+    ("course", 12) or ("lesson", 12, 3). Concurrent misses for one key are
+    coalesced into a single load, and invalidate_course() drops every entry
+    for a course, including loads that started before the write.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.entries = TTLCache(maxsize, ttl)
+        self.loads = SingleFlight()
+        # course_id -> monotonic time of its last invalidation
+        self.invalidations = TTLCache(maxsize, ttl)
+        self.hits = 0
+        self.loads_started = 0
+
+    async def get_or_load(self, key: tuple, loader: Callable[[], Awaitable[Any]]):
+        value = self.entries.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        return await self.loads.do(key, self._load, key, loader)
+
+    async def _load(self, key: tuple, loader: Callable[[], Awaitable[Any]]):
+        self.loads_started += 1
+        started = time.monotonic()
+        value = await loader()
+        # Don't store a value read before a concurrent write invalidated the course
+        invalidated = self.invalidations.get(key[1])
+        if invalidated is None or invalidated < started:
+            self.entries.set(key, value)
+        return value
+
+    def invalidate_course(self, course_id: int):
+        self.invalidations.set(course_id, time.monotonic())
+        self.entries.delete_where(lambda key: key[1] == course_id)
+        for key in [key for key in self.loads.tasks if key[1] == course_id]:
+            self.loads.forget(key)
+
+    def stats(self) -> dict:
+        return {"entries": len(self.entries), "hits": self.hits, "loads": self.loads_started}
@@ -0,0 +1,133 @@
+import asyncio
+from typing import Callable
+from contextlib import asynccontextmanager
+import asyncpg
+import orjson
+from database import get_db_config
+
+# Single Postgres NOTIFY channel; every payload carries the course_id and stage
+CHANNEL = "course_events"
+
+# Max buffered events per subscriber before it is cut off
+SUBSCRIBER_QUEUE_SIZE = 100
+# Put in a subscriber's queue instead of events it fell too far behind on; its stream must end
+FELL_BEHIND = None
+
+# Dedicated LISTEN connection (kept outside the pool so it is never recycled)
+listener_connection: asyncpg.Connection | None = None
+
+# course_id -> set of subscriber queues
+subscribers: dict[int, set[asyncio.Queue]] = {}
+
+# Callbacks run for every event of every course (e.g. cache invalidation)
+event_handlers: list[Callable[[dict], None]] = []
+
+
+def add_event_handler(handler: Callable[[dict], None]):
+    """Run handler(event) for every course event received by this process"""
+    event_handlers.append(handler)
+
+
+def _dispatch(connection, pid, channel, payload):
+    """Fan a NOTIFY payload out to every subscriber of that course"""
+    try:
+        event = orjson.loads(payload)
+    except orjson.JSONDecodeError:
+        print(f"⚠️ Ignoring malformed course event: {payload[:200]}")
+        return
+
+    for handler in event_handlers:
+        try:
+            handler(event)
+        except Exception as e:
+            print(f"⚠️ Course event handler failed: {e}")
+
+    course_id = event.get("course_id")
+    for queue in list(subscribers.get(course_id, ())):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow consumer: stop feeding it and let its stream end, so the client
+            # reconnects and resyncs from a fresh snapshot
+            _unsubscribe(course_id, queue)
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(FELL_BEHIND)
+
+
+def _on_listener_terminated(connection):
+    """Reconnect the listener if Postgres drops the connection"""
+    global listener_connection
+    if connection is not listener_connection:
+        return  # A connection we already replaced or closed
+    listener_connection = None
+    print("⚠️ Course event listener connection lost, reconnecting...")
+    asyncio.get_event_loop().create_task(_reconnect_listener())
+
+
+async def _reconnect_listener():
+    delay = 1
+    while listener_connection is None:
+        try:
+            await start_event_listener()
+            return
+        except Exception as e:
+            print(f"❌ Course event listener reconnect failed: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+
+async def start_event_listener():
+    """Open the dedicated LISTEN connection used to fan out course events"""
+    global listener_connection
+    connection = await asyncpg.connect(**get_db_config())
+    await connection.add_listener(CHANNEL, _dispatch)
+    connection.add_termination_listener(_on_listener_terminated)
+    listener_connection = connection
+    print("✅ Course event listener started")
+
+
+async def stop_event_listener():
+    """Close the dedicated LISTEN connection"""
+    global listener_connection
+    connection = listener_connection
+    listener_connection = None
+    if connection:
+        connection.remove_termination_listener(_on_listener_terminated)
+        await connection.close()
+        print("✅ Course event listener stopped")
+
+
+async def notify_course_event(connection: asyncpg.Connection, course_id: int, stage: str, **data):
+    """
+    Publish a progress event for a course
+
+    Delivered to subscribers in every backend process once the surrounding
+    transaction (if any) commits.
+    """
+    payload = orjson.dumps({"course_id": course_id, "stage": stage, **data}).decode()
+    await connection.execute("SELECT pg_notify($1, $2)", CHANNEL, payload)
+
+
+def _unsubscribe(course_id: int, queue: asyncio.Queue):
+    course_subscribers = subscribers.get(course_id)
+    if course_subscribers is not None:
+        course_subscribers.discard(queue)
+        if not course_subscribers:
+            del subscribers[course_id]
+
+
+@asynccontextmanager
+async def subscribe(course_id: int):
+    """
+    Register a queue that receives every event published for a course
+
+    If the consumer falls SUBSCRIBER_QUEUE_SIZE events behind, the queue is
+    unsubscribed and its next item is FELL_BEHIND.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    subscribers.setdefault(course_id, set()).add(queue)
+    try:
+        yield queue
+    finally:
+        _unsubscribe(course_id, queue)
@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response
+
+# Browsers may store private responses but must revalidate them on every view
+PRIVATE_REVALIDATE = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Build a weak ETag from the identifiers and version of a resource"""
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+
+def http_date(value: datetime) -> str:
+    """Format a (UTC) database timestamp as an HTTP date"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value, usegmt=True)
+
+
+def cache_headers(etag: str, last_modified: datetime | None = None, cache_control: str = PRIVATE_REVALIDATE) -> dict:
+    """Validator headers to send with a 200 or 304 response"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime | None = None) -> bool:
+    """
+    Check the request's conditional headers against the current validators
+
+    If-None-Match takes precedence; If-Modified-Since is only consulted when
+    the client sent no ETag (RFC 9110 section 13.2.2).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison: ignore the W/ prefix on both sides
+        current = etag.removeprefix("W/")
+        return any(tag.strip().removeprefix("W/") == current for tag in if_none_match.split(","))
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        # HTTP dates have one-second resolution
+        return last_modified.replace(microsecond=0) <= since
+
+    return False
+
+
+def not_modified(headers: dict) -> Response:
+    """Empty 304 response carrying the current validators"""
+    return Response(status_code=304, headers=headers)
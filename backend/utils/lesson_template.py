@@ -0,0 +1,67 @@
+"""
+Prebuilt lesson scene used by the template renderer (VIDEO_RENDERER=template)
+
+Only imported inside manim render processes. The generated scene file
+declares one thin SectionN(LessonSection) class per narration segment and
+sets its `segment`; every lesson then runs this same, already tested
+animation instead of freshly generated code.
+"""
+from manim import *
+from manim_voiceover import VoiceoverScene
+from manim_voiceover.services.gtts import GTTSService
+
+# Longest a single reveal animates; the rest of its share of the narration is a pause
+MAX_REVEAL_SECONDS = 1.5
+
+
+def fit_width(mobject: Mobject, margin: float = 1.5) -> Mobject:
+    """Shrink mobject so it fits across the frame"""
+    max_width = config.frame_width - margin
+    if mobject.width > max_width:
+        mobject.scale_to_fit_width(max_width)
+    return mobject
+
+
+class LessonSection(VoiceoverScene):
+    """
+    One narration segment: a heading, bullets revealed one by one, and an
+    optional highlighted takeaway, paced evenly across the voiceover
+
+    segment = {"narration": str, "heading": str, "bullets": [str], "highlight": str | None}
+    """
+
+    segment: dict = {}
+
+    def construct(self):
+        self.camera.background_color = WHITE
+        self.set_speech_service(GTTSService())
+
+        heading = fit_width(Text(self.segment["heading"], font_size=44, color=BLACK, weight=BOLD)).to_edge(UP, buff=0.8)
+        reveals = [Write(heading)]
+
+        bullets = VGroup(*(
+            fit_width(Text(f"• {bullet}", font_size=32, color=BLACK))
+            for bullet in self.segment.get("bullets") or []
+        ))
+        if bullets:
+            bullets.arrange(DOWN, aligned_edge=LEFT, buff=0.45).next_to(heading, DOWN, buff=0.7)
+            if bullets.height > config.frame_height - 3:
+                bullets.scale_to_fit_height(config.frame_height - 3).next_to(heading, DOWN, buff=0.7)
+            reveals += [FadeIn(bullet, shift=RIGHT * 0.3) for bullet in bullets]
+
+        if self.segment.get("highlight"):
+            highlight = fit_width(Text(self.segment["highlight"], font_size=34, color=BLUE, weight=BOLD))
+            highlight.to_edge(DOWN, buff=0.8)
+            box = SurroundingRectangle(highlight, color=BLUE, buff=0.2)
+            reveals.append(AnimationGroup(FadeIn(highlight, scale=1.1), Create(box)))
+
+        with self.voiceover(text=self.segment["narration"]) as tracker:
+            share = tracker.duration / len(reveals)
+            for reveal in reveals:
+                run_time = min(share, MAX_REVEAL_SECONDS)
+                self.play(reveal, run_time=run_time)
+                if share - run_time > 0.05:
+                    self.wait(share - run_time)
+
+        # Leave an empty frame so the cut to the next section is seamless
+        self.play(FadeOut(Group(*self.mobjects)), run_time=0.5)
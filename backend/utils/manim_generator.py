@@ -1,13 +1,107 @@
 import os
+import re
+import ast
+import json
+import time
 import asyncio
-import tempfile
-import shutil
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Awaitable, Callable
 from anthropic import AsyncAnthropic
+from utils.render_scheduler import render_scheduler, lesson_job, INTERACTIVE, UPGRADE
+from utils import render_cache
+from utils.storage_manager import render_temp_dir
+from utils.render_sandbox import run_sandboxed, combine_stats, record_render
+from utils.tts_cache import TTS_BACKEND, warm_tts_cache, synthesize, voiceover_texts
 
 client = AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
 
-async def generate_manim_video(course_id: int, module_index: int, module_name: str, lesson_content: str) -> str:
+MODEL = "claude-sonnet-4-5-20250929"
+
+# Part of every cache key; bump when prompts change
+NARRATION_VERSION = "3"
+SCENE_VERSION = "3"
+PLAN_VERSION = "1"
+# Goes into every template scene, and so into its video cache key; bump when utils/lesson_template.py changes
+TEMPLATE_VERSION = "1"
+
+# "llm": Claude writes the manim code for every lesson
+# "template": Claude writes a small scene plan that utils/lesson_template.py renders, falling back to "llm"
+VIDEO_RENDERER = os.getenv("VIDEO_RENDERER", "llm")
+# Background is set on the command line so the first frame is already white (no border to crop)
+BACKGROUND_COLOR = "#FFFFFF"
+# Optional crop filter (e.g. "iw-3:ih-2:2:1") applied while remuxing; costs a video re-encode
+VIDEO_CROP = os.getenv("VIDEO_CROP", "")
+
+# Part of every rendered video's cache key
+RENDER_PROFILE = f"bg{BACKGROUND_COLOR}-faststart-crop{VIDEO_CROP}-tts{TTS_BACKEND}"
+
+# Poster frame: the first frame this far in (frame 0 is still an empty background)
+POSTER_SECONDS = 2
+# Thumbnail sprite: one frame every THUMBNAIL_INTERVAL seconds, THUMBNAIL_WIDTH px wide, tiled
+# THUMBNAIL_GRID (columns x rows) in playback order; covers 100 s, the rest stays background
+THUMBNAIL_INTERVAL = 5
+THUMBNAIL_WIDTH = 160
+THUMBNAIL_GRID = "5x4"
+
+# Put in front of every scene so its GTTSService reads from the shared TTS cache (see utils/tts_service.py)
+SCENE_PRELUDE = "from utils.tts_service import install; install()\n"
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# manim quality flags per video quality tier, fastest first
+RENDER_QUALITIES = {
+    "preview": ["-r", "426,240", "--fps", "10"],
+    "low": ["-ql"],  # 854x480 @ 15 fps
+    "medium": ["-qm"],  # 1280x720 @ 30 fps
+    "high": ["-qh"],  # 1920x1080 @ 60 fps
+}
+
+# Scene code regenerations allowed per video before giving up on code that fails validation
+SCENE_CODE_RETRIES = int(os.getenv("SCENE_CODE_RETRIES", "2"))
+
+# Rendered once at startup with VIDEO_RENDERER=template; uses every part of the template
+WARM_UP_SEGMENT = {"narration": "Ready.", "heading": "Warm-up", "bullets": ["First point"], "highlight": "Takeaway"}
+warm_up_task: asyncio.Task | None = None
+
+# stage -> {"count", "total_seconds", "max_seconds"} for every video generated by this process
+stage_timings: dict[str, dict] = {}
+
+
+@contextmanager
+def timed(stage: str, module_name: str):
+    """Record how long one pipeline stage took"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        stats = stage_timings.setdefault(stage, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+        stats["count"] += 1
+        stats["total_seconds"] += elapsed
+        stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+        print(f"⏱️ {stage} took {elapsed:.1f}s for module: {module_name}")
+
+
+def stage_metrics() -> dict:
+    return {
+        stage: {
+            "count": stats["count"],
+            "avg_seconds": round(stats["total_seconds"] / stats["count"], 3),
+            "max_seconds": round(stats["max_seconds"], 3),
+        }
+        for stage, stats in stage_timings.items()
+    }
+
+
+async def generate_manim_video(
+    course_id: int,
+    module_index: int,
+    module_name: str,
+    lesson_content: str,
+    priority: int = INTERACTIVE,
+    quality: str = "low",
+    on_narration: Callable[[str], Awaitable] | None = None
+) -> dict:
     """
     Generate a manim video with audio narration using manim-voiceover plugin
 
@@ -16,111 +110,246 @@ async def generate_manim_video(course_id: int, module_index: int, module_name: s
         module_index: Index of the module
         module_name: Name of the module
         lesson_content: Content of the lesson
+        priority: Render scheduler priority (INTERACTIVE, PREFETCH or UPGRADE)
+        quality: Render quality tier, a key of RENDER_QUALITIES
+        on_narration: Called with the narration script as soon as it exists;
+            runs alongside the render and is awaited before returning
 
     Returns:
-        URL path to the generated video
+        URL paths {"video_url", "poster_url", "thumbnail_url"}, where the
+        images are None if they could not be extracted, and "render_stats":
+        the render's CPU seconds and peak RSS (None if an earlier render was reused)
+
+    Narration and scene code come from a single Claude call; with
+    VIDEO_RENDERER=template, Claude only writes a short scene plan that a
+    prebuilt scene animates, and codegen is the fallback if that fails. Each
+    stage is cached by the hash of its inputs, so a retry only redoes the
+    stages that have not succeeded yet, and identical lessons in different
+    courses share one rendered file.
     """
-    try:
-        # Step 1: Generate narration script using Claude
-        print(f"🗣️ Generating narration script for module: {module_name}")
-        narration_script = await generate_narration_script(module_name, lesson_content)
-
-        # Step 2: Generate manim code with voiceover plugin
-        print(f"📝 Generating manim code with voiceover for module: {module_name}")
-        manim_code = await generate_manim_code_with_voiceover(module_name, lesson_content, narration_script)
-
-        # Step 3: Execute manim code (voiceover plugin handles audio generation and syncing)
-        print(f"🎬 Rendering manim video with voiceover for module: {module_name}")
-        video_path = await execute_manim_code(course_id, module_index, manim_code)
-
-        # Step 4: Return the video URL (relative path for frontend)
-        video_url = f"/videos/{course_id}/{module_index}.mp4"
-        print(f"✅ Video with voiceover generated: {video_url}")
+    narration_task = None
+    published_narration = None
 
-        return video_url
+    def narration_ready(narration_script: str):
+        nonlocal narration_task, published_narration
+        published_narration = narration_script
+        if on_narration is not None and narration_task is None:
+            narration_task = asyncio.ensure_future(on_narration(narration_script))
 
+    try:
+        with timed("total", module_name):
+            urls = None
+            if VIDEO_RENDERER == "template":
+                try:
+                    # Step 1: Plan the lesson on screen and turn the plan into template scene code
+                    manim_code, narration_segments = await write_template_scene(module_name, lesson_content, narration_ready)
+                    # Step 2: Render it
+                    urls = await render_video(course_id, module_index, module_name, manim_code, narration_segments, priority, quality)
+                except Exception as e:
+                    print(f"⚠️ Template renderer failed for module {module_name}, falling back to generated scene code: {e}")
+
+            if urls is None:
+                # Step 1: Write the narration and the manim scene that voices it; after a failed
+                # template run, the scene voices the plan's narration, which may already be published
+                manim_code, scene_key = await write_scene_code(module_name, lesson_content, narration_ready, published_narration)
+                # Step 2: Execute manim code (voiceover plugin handles audio generation and syncing)
+                try:
+                    urls = await render_video(course_id, module_index, module_name, manim_code, voiceover_texts(manim_code), priority, quality)
+                except Exception:
+                    # Don't hand the same broken scene to the next retry
+                    render_cache.discard("scenes", scene_key)
+                    raise
+
+        print(f"✅ Video with voiceover generated: {urls['video_url']}")
+        return urls
+
+    except asyncio.CancelledError:
+        # The course was deleted; its narration has nowhere to go either
+        if narration_task is not None:
+            narration_task.cancel()
+        raise
     except Exception as e:
         print(f"❌ Failed to generate manim video: {e}")
         raise
+    finally:
+        if narration_task is not None:
+            await narration_task
 
 
-async def generate_narration_script(module_name: str, lesson_content: str) -> str:
-    """
-    Generate a narration script for the lesson using Claude AI
+async def write_scene_code(
+    module_name: str,
+    lesson_content: str,
+    narration_ready: Callable[[str], None],
+    narration_script: str | None = None
+) -> tuple[str, str]:
     """
-    message = await client.messages.create(
-        model="claude-sonnet-4-5-20250929",
-        max_tokens=2048,
-        messages=[
-            {
-                "role": "user",
-                "content": f"""You are an educational content creator. Write a clear, engaging narration script for a 40-50 second educational video.
+    Narration and validated manim code written by Claude, each from the cache when possible
 
-Module: {module_name}
-Content: {lesson_content}
+    A given narration_script (one segment per line) is voiced as-is instead
+    of writing a new one.
 
-Requirements:
-1. Write in a friendly, conversational tone suitable for voice narration
-2. Keep it concise - aim for 40-50 seconds when read aloud at normal speaking pace (approximately 120-150 words)
-3. Break the narration into 3-5 logical segments/sentences that can be paired with visual animations
-4. Start with a hook to grab attention
-5. Explain the concept clearly and simply
-6. Use short sentences that flow well when spoken
-7. End with a key takeaway or summary
-8. Avoid complex jargon - use accessible language
-9. Make it engaging and memorable
+    Returns:
+        (manim_code, scene_key)
+    """
+    manim_code = None
+    if narration_script is None:
+        narration_key = render_cache.content_hash(MODEL, NARRATION_VERSION, module_name, lesson_content)
+        narration_script = render_cache.get_text("narration", narration_key)
+        if narration_script is None:
+            print(f"📝 Generating narration and manim code for module: {module_name}")
+            with timed("script", module_name):
+                narration_script, manim_code = await generate_lesson_script(module_name, lesson_content)
+            render_cache.put_text("narration", narration_key, narration_script)
+        else:
+            print(f"♻️ Reusing cached narration script for module: {module_name}")
+        narration_ready(narration_script)
+
+    scene_key = render_cache.content_hash(MODEL, SCENE_VERSION, module_name, lesson_content, narration_script)
+    if manim_code is None:
+        manim_code = render_cache.get_text("scenes", scene_key)
+        if manim_code is not None:
+            print(f"♻️ Reusing cached manim code for module: {module_name}")
+
+    # Reject broken code before it spawns a renderer or holds a render slot
+    retries = 0
+    problems = validate_manim_code(manim_code) if manim_code is not None else []
+    while manim_code is None or problems:
+        if problems:
+            if retries >= SCENE_CODE_RETRIES:
+                raise Exception(f"Generated manim code is still invalid after {retries} retries: {'; '.join(problems)}")
+            retries += 1
+            print(f"⚠️ Generated manim code rejected ({'; '.join(problems)}), regenerating")
+        # Narration is kept, only the scene needs rewriting
+        print(f"📝 Generating manim code with voiceover for module: {module_name}")
+        with timed("scene_code", module_name):
+            manim_code = await generate_manim_code_with_voiceover(module_name, lesson_content, narration_script, problems)
+        problems = validate_manim_code(manim_code)
+    render_cache.put_text("scenes", scene_key, manim_code)
 
-IMPORTANT: Only output the narration script text - no additional formatting, labels, or explanations.
+    return manim_code, scene_key
 
-Example format:
-"Welcome! Today we're exploring [topic]. [Main explanation in 2-3 sentences]. Here's why this matters: [impact/application]. Remember: [key takeaway]."
 
-Generate the narration script now (120-150 words for 40-50 seconds):"""
-            }
-        ]
-    )
+async def write_template_scene(module_name: str, lesson_content: str, narration_ready: Callable[[str], None]) -> tuple[str, list[str]]:
+    """
+    Template scene code for the lesson, built from a cached or freshly written scene plan
+
+    Returns:
+        (manim_code, narration_segments)
+    """
+    plan_key = render_cache.content_hash(MODEL, PLAN_VERSION, module_name, lesson_content)
+    cached_plan = render_cache.get_text("plans", plan_key)
+    if cached_plan is None:
+        print(f"📝 Generating scene plan for module: {module_name}")
+        with timed("plan", module_name):
+            segments = await generate_lesson_plan(module_name, lesson_content)
+        render_cache.put_text("plans", plan_key, json.dumps(segments))
+    else:
+        print(f"♻️ Reusing cached scene plan for module: {module_name}")
+        segments = json.loads(cached_plan)
+
+    narration_segments = [segment["narration"] for segment in segments]
+    narration_ready("\n".join(narration_segments))
+    return template_scene_code(segments), narration_segments
+
+
+async def render_video(
+    course_id: int,
+    module_index: int,
+    module_name: str,
+    manim_code: str,
+    voiceovers: list[str],
+    priority: int,
+    quality: str
+) -> dict:
+    """Render manim_code into the lesson's video file, reusing an identical earlier render; returns its URLs and render stats"""
+    video_key = render_cache.content_hash(RENDER_PROFILE, quality, manim_code)
+    video_path = await link_cached_render(video_key, course_id, module_index, quality)
+    if video_path is not None:
+        print(f"♻️ Reusing cached render for module: {module_name}")
+        render_stats = None
+    else:
+        # Speak every voiceover up front, concurrently, instead of serially inside manim
+        with timed("tts", module_name):
+            warmed = await warm_tts_cache(voiceovers)
+        print(f"🗣️ {warmed} voiceover(s) ready for module: {module_name}")
 
-    return message.content[0].text.strip()
+        print(f"🎬 Rendering manim video with voiceover for module: {module_name}")
+        with timed("render", module_name):
+            video_file, render_stats = await execute_manim_code(course_id, module_index, manim_code, priority, quality)
+            video_path = Path(video_file)
+        render_cache.put_video(video_key, video_path)
+        record_render(render_stats)
+        print(f"📊 Render used {render_stats['cpu_seconds']} CPU seconds, peak RSS {render_stats['peak_rss_mb']} MB for module: {module_name}")
+
+    # Relative paths for the frontend
+    urls = {"video_url": f"/videos/{course_id}/{video_path.name}", "render_stats": render_stats}
+    for field, suffix in (("poster_url", render_cache.POSTER_SUFFIX), ("thumbnail_url", render_cache.THUMBNAILS_SUFFIX)):
+        image = render_cache.sidecar(video_path, suffix)
+        urls[field] = f"/videos/{course_id}/{image.name}" if image.exists() else None
+    return urls
+
+
+async def link_cached_render(video_key: str, course_id: int, module_index: int, quality: str) -> Path | None:
+    """Link the cached render for video_key into the course's videos; None on a miss, including one evicted meanwhile"""
+    cached_video = render_cache.get_video(video_key)
+    if cached_video is None:
+        return None
+    try:
+        digest = await asyncio.to_thread(render_cache.file_digest, cached_video)
+    except FileNotFoundError:
+        return None
+    video_path = Path("static/videos") / str(course_id) / video_file_name(module_index, quality, digest)
+    return video_path if render_cache.link_video(video_key, video_path) else None
 
 
-async def generate_manim_code_with_voiceover(module_name: str, lesson_content: str, narration_script: str) -> str:
+async def synthesize_narration_audio(course_id: int, module_index: int, narration_script: str) -> str:
     """
-    Use Claude AI to generate manim Python code using manim-voiceover plugin
+    Speak the whole narration into one MP3 next to the lesson's videos
+
+    Returns:
+        URL path to the narration audio
     """
-    message = await client.messages.create(
-        model="claude-sonnet-4-5-20250929",
-        max_tokens=4096,
-        messages=[
-            {
-                "role": "user",
-                "content": f"""You are an expert at creating educational videos using Manim (Mathematical Animation Engine) with the manim-voiceover plugin.
+    speech = await asyncio.to_thread(synthesize, narration_script)
 
-Generate a Manim scene that teaches the following concept with synchronized voiceover:
+    digest = await asyncio.to_thread(render_cache.file_digest, speech)
+    audio_file = Path("static/videos") / str(course_id) / f"{module_index}-narration-{digest[:12]}.mp3"
+    audio_file.parent.mkdir(parents=True, exist_ok=True)
+    render_cache.write_atomic(audio_file, lambda temp: render_cache.link_or_copy(speech, temp))
+
+    return f"/videos/{course_id}/{audio_file.name}"
 
-Module: {module_name}
-Content: {lesson_content}
 
-Narration Script (this will be the voiceover):
-"{narration_script}"
-
-Requirements:
-1. Create a class called "LessonScene" that inherits from VoiceoverScene (not Scene!)
-2. Import: from manim_voiceover import VoiceoverScene
-3. Import: from manim_voiceover.services.gtts import GTTSService
-4. In construct(), FIRST set: self.camera.background_color = WHITE (white background!)
-5. In construct(), call: self.set_speech_service(GTTSService())
-6. Use self.voiceover(text="...") as tracker: blocks to add voiceovers
-7. CRITICAL: Every voiceover block MUST have non-empty text. Never use text="" or empty strings!
-8. Sync animations using tracker.duration: self.play(Animation, run_time=tracker.duration)
-9. Break the narration into multiple voiceover blocks for better pacing
-10. Use clear, readable text (font size 36 or larger)
-11. Use colors that work well on white background (BLACK for text, BLUE, GREEN, RED, ORANGE for highlights)
-12. Include a title at the start
-13. Use manim's built-in animations like Write, FadeIn, FadeOut, Transform, Create, etc.
-14. For visual-only animations without narration, use self.play() without voiceover context manager
-
-IMPORTANT: Only output valid Python code using Manim Community Edition with manim-voiceover.
-Do not include any explanations or markdown formatting - only the Python code.
+NARRATION_REQUIREMENTS = """1. Write in a friendly, conversational tone suitable for voice narration
+2. Keep it concise - aim for 40-50 seconds when read aloud at normal speaking pace (approximately 120-150 words)
+3. Break the narration into 3-5 logical segments/sentences that can be paired with visual animations
+4. Start with a hook to grab attention
+5. Explain the concept clearly and simply
+6. Use short sentences that flow well when spoken
+7. End with a key takeaway or summary
+8. Avoid complex jargon - use accessible language
+9. Make it engaging and memorable"""
+
+
+def scene_requirements(module_name: str) -> str:
+    """Rules and example for the section scenes, shared by both code prompts"""
+    return f"""Requirements:
+1. Create one class per narration segment, named Section1, Section2, ... in speaking order, each inheriting from VoiceoverScene (not Scene!)
+2. Each section is rendered as a separate video in its own process and the videos are played back to back, so every section must be self-contained: create every object it uses and never reference variables or objects from another section
+3. Import: from manim_voiceover import VoiceoverScene
+4. Import: from manim_voiceover.services.gtts import GTTSService
+5. In every construct(), FIRST set: self.camera.background_color = WHITE (white background!)
+6. In every construct(), call: self.set_speech_service(GTTSService())
+7. Each section speaks its own segment with self.voiceover(text="...") as tracker: blocks (split a long segment into several blocks for better pacing)
+8. CRITICAL: Every voiceover block MUST have non-empty text. Never use text="" or empty strings!
+9. Sync animations using tracker.duration: self.play(Animation, run_time=tracker.duration)
+10. End every section by fading out everything on screen, so the cut to the next section is seamless
+11. Use clear, readable text (font size 36 or larger)
+12. Use colors that work well on white background (BLACK for text, BLUE, GREEN, RED, ORANGE for highlights)
+13. Include a title at the start of Section1
+14. Use manim's built-in animations like Write, FadeIn, FadeOut, Transform, Create, etc.
+15. For visual-only animations without narration, use self.play() without voiceover context manager
+
+Only use Manim Community Edition with manim-voiceover. Do not import anything other than manim, manim_voiceover, numpy, math and random.
 
 Example structure:
 ```python
@@ -128,7 +357,7 @@ from manim import *
 from manim_voiceover import VoiceoverScene
 from manim_voiceover.services.gtts import GTTSService
 
-class LessonScene(VoiceoverScene):
+class Section1(VoiceoverScene):
     def construct(self):
         # IMPORTANT: Set white background first!
         self.camera.background_color = WHITE
@@ -141,29 +370,131 @@ class LessonScene(VoiceoverScene):
 
         self.play(FadeOut(title))
 
+class Section2(VoiceoverScene):
+    def construct(self):
+        self.camera.background_color = WHITE
+        self.set_speech_service(GTTSService())
+
         # Main content with synchronized voiceovers
         with self.voiceover(text="First key concept...") as tracker:
             text1 = Text("Concept 1", font_size=36, color=BLACK)
             self.play(FadeIn(text1), run_time=tracker.duration)
 
-        # For animations without narration, use self.play() directly
-        self.play(FadeOut(text1))
-
         # More voiceover blocks with non-empty text
         with self.voiceover(text="Let me explain further...") as tracker:
-            text2 = Text("More details", font_size=36, color=BLACK)
+            text2 = Text("More details", font_size=36, color=BLACK).next_to(text1, DOWN)
             self.play(Write(text2), run_time=tracker.duration)
-```
+
+        # For animations without narration, use self.play() directly
+        self.play(FadeOut(text1), FadeOut(text2))
+```"""
+
+
+LESSON_SCRIPT_TOOL = {
+    "name": "submit_lesson_video",
+    "description": "Submit the narration and the Manim scene for an educational lesson video",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "narration_segments": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "The narration split into 3-5 segments, in speaking order"
+            },
+            "manim_code": {
+                "type": "string",
+                "description": "Complete Python source with one SectionN scene per narration segment"
+            }
+        },
+        "required": ["narration_segments", "manim_code"]
+    }
+}
+
+
+async def generate_lesson_script(module_name: str, lesson_content: str) -> tuple[str, str]:
+    """
+    Use Claude AI to write the narration and the matching manim scene in one call
+
+    Returns:
+        (narration_script, manim_code)
+    """
+    message = await client.messages.create(
+        model=MODEL,
+        max_tokens=6144,
+        tools=[LESSON_SCRIPT_TOOL],
+        tool_choice={"type": "tool", "name": LESSON_SCRIPT_TOOL["name"]},
+        messages=[
+            {
+                "role": "user",
+                "content": f"""You are an educational content creator and an expert at creating educational videos using Manim (Mathematical Animation Engine) with the manim-voiceover plugin.
+
+Create a 40-50 second educational video that teaches the following concept:
+
+Module: {module_name}
+Content: {lesson_content}
+
+First write the narration script (this will be the voiceover):
+{NARRATION_REQUIREMENTS}
+
+Then write the Manim scenes that voice and animate the narration, one section per segment.
+
+{scene_requirements(module_name)}
+
+Submit both with the {LESSON_SCRIPT_TOOL["name"]} tool."""
+            }
+        ]
+    )
+
+    script = next(block.input for block in message.content if block.type == "tool_use")
+    segments = [segment.strip() for segment in script["narration_segments"] if segment.strip()]
+    if not segments:
+        raise Exception("Claude returned an empty narration script")
+
+    # One segment per line, so a code-only retry can still map sections to segments
+    return "\n".join(segments), strip_code_fences(script["manim_code"])
+
+
+async def generate_manim_code_with_voiceover(module_name: str, lesson_content: str, narration_script: str, problems: list[str] | None = None) -> str:
+    """
+    Use Claude AI to generate manim Python code using manim-voiceover plugin
+
+    problems lists what was wrong with the previous attempt, if any.
+    """
+    feedback = ""
+    if problems:
+        feedback = "A previous attempt was rejected for these problems, avoid them:\n" + "\n".join(f"- {problem}" for problem in problems) + "\n\n"
+
+    message = await client.messages.create(
+        model=MODEL,
+        max_tokens=4096,
+        messages=[
+            {
+                "role": "user",
+                "content": f"""You are an expert at creating educational videos using Manim (Mathematical Animation Engine) with the manim-voiceover plugin.
+
+Generate the Manim section scenes that teach the following concept with synchronized voiceover:
+
+Module: {module_name}
+Content: {lesson_content}
+
+Narration Script (this will be the voiceover, one segment per line):
+{narration_script}
+
+{scene_requirements(module_name)}
+
+{feedback}IMPORTANT: Only output valid Python code. Do not include any explanations or markdown formatting - only the Python code.
 
 Now generate the complete Manim code with voiceover:"""
             }
         ]
     )
 
-    # Extract code from response
-    code = message.content[0].text.strip()
+    return strip_code_fences(message.content[0].text)
+
 
-    # Remove markdown code fences if present
+def strip_code_fences(code: str) -> str:
+    """Remove markdown code fences if present"""
+    code = code.strip()
     if code.startswith('```'):
         lines = code.split('\n')
         if lines[0].startswith('```'):
@@ -175,84 +506,248 @@ Now generate the complete Manim code with voiceover:"""
     return code
 
 
-async def execute_manim_code(course_id: int, module_index: int, manim_code: str) -> str:
+
+LESSON_PLAN_TOOL = {
+    "name": "submit_lesson_plan",
+    "description": "Submit the narration and the on-screen plan for an educational lesson video",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "segments": {
+                "type": "array",
+                "description": "3-5 segments in speaking order; each becomes one slide voiced by its narration",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "narration": {"type": "string", "description": "What the narrator says during this segment"},
+                        "heading": {"type": "string", "description": "Slide heading, at most 6 words"},
+                        "bullets": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "0-4 key points revealed one by one as they are spoken, at most 8 words each"
+                        },
+                        "highlight": {"type": "string", "description": "Optional takeaway shown emphasised at the end, at most 10 words"}
+                    },
+                    "required": ["narration", "heading", "bullets"]
+                }
+            }
+        },
+        "required": ["segments"]
+    }
+}
+
+
+async def generate_lesson_plan(module_name: str, lesson_content: str) -> list[dict]:
     """
-    Execute manim code with voiceover plugin (audio generation and syncing handled by plugin)
+    Use Claude AI to write the narration as slides for the lesson template
+
+    Returns:
+        Segments of {"narration", "heading", "bullets", "highlight"}, in speaking order
     """
-    temp_dir = None
-    try:
-        # Create temp directory for manim execution
-        temp_dir = tempfile.mkdtemp()
-        temp_path = Path(temp_dir)
-        scene_file = temp_path / "scene.py"
+    message = await client.messages.create(
+        model=MODEL,
+        max_tokens=2048,
+        tools=[LESSON_PLAN_TOOL],
+        tool_choice={"type": "tool", "name": LESSON_PLAN_TOOL["name"]},
+        messages=[
+            {
+                "role": "user",
+                "content": f"""You are an educational content creator. Plan a 40-50 second narrated slide video that teaches the following concept:
 
-        # Write manim code to file
-        print(f"📄 Writing manim scene to {scene_file}")
-        scene_file.write_text(manim_code)
+Module: {module_name}
+Content: {lesson_content}
 
-        # Execute manim with voiceover to render video (async subprocess)
-        print(f"🎬 Running manim renderer with voiceover...")
-        try:
-            process = await asyncio.create_subprocess_exec(
-                "manim",
-                "-ql",  # Low quality for faster rendering
-                "--format=mp4",
-                "--media_dir",
-                str(temp_path / "media"),
-                str(scene_file),
-                "LessonScene",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=temp_dir
-            )
-            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=300)
+Write the narration script (this will be the voiceover):
+{NARRATION_REQUIREMENTS}
 
-            if process.returncode != 0:
-                error_msg = f"Manim rendering failed:\nSTDOUT: {stdout.decode()}\nSTDERR: {stderr.decode()}"
-                print(f"❌ {error_msg}")
-                raise Exception(error_msg)
+Pair every narration segment with one slide: a short heading, a few short bullet points that appear while the segment is spoken, and optionally a highlighted takeaway. The first slide's heading is the module name. Slide text must be plain words (no code, formulas or markdown), short enough to read at a glance.
 
-            print(f"✅ Manim rendering with voiceover completed successfully")
-        except asyncio.TimeoutError:
-            raise Exception("Manim rendering timed out after 5 minutes")
+Submit the plan with the {LESSON_PLAN_TOOL["name"]} tool."""
+            }
+        ]
+    )
+
+    plan = next(block.input for block in message.content if block.type == "tool_use")
+    segments = []
+    for segment in plan.get("segments") or []:
+        narration = str(segment.get("narration") or "").strip()
+        if not narration:
+            continue
+        segments.append({
+            "narration": " ".join(narration.split()),
+            "heading": str(segment.get("heading") or module_name).strip(),
+            "bullets": [str(bullet).strip() for bullet in segment.get("bullets") or [] if str(bullet).strip()][:4],
+            "highlight": str(segment.get("highlight") or "").strip() or None,
+        })
+    if not segments:
+        raise Exception("Claude returned an empty scene plan")
+    return segments
+
+
+def template_scene_code(segments: list[dict]) -> str:
+    """Scene code declaring one LessonSection per planned segment, in the same SectionN layout as generated code"""
+    lines = [f"# lesson_template v{TEMPLATE_VERSION}", "from utils.lesson_template import LessonSection"]
+    for index, segment in enumerate(segments, start=1):
+        lines += ["", "", f"class Section{index}(LessonSection):", f"    segment = {segment!r}"]
+    return "\n".join(lines) + "\n"
+
+async def warm_up_template_renderer():
+    """
+    Render a throwaway template section at preview quality
 
-        # Find the generated video file (with audio already embedded by manim-voiceover)
-        media_path = temp_path / "media" / "videos" / "scene" / "480p15"
-        if not media_path.exists():
-            raise Exception(f"Media path does not exist: {media_path}")
+    The first render after a start builds the font caches, compiles the
+    template and pulls manim and its libraries into the page cache; doing
+    that here keeps it out of the first learner's render, and a broken
+    template install shows up in the log at startup. Runs at UPGRADE
+    priority, so it never holds up a lesson.
+    """
+    started = time.perf_counter()
+    try:
+        with render_temp_dir() as temp_path:
+            scene_file = temp_path / "scene.py"
+            scene_file.write_text(SCENE_PRELUDE + template_scene_code([WARM_UP_SEGMENT]))
+            await render_scene(0, 0, UPGRADE, "preview", scene_file, "Section1")
+        print(f"✅ Template renderer warmed up in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        print(f"⚠️ Template renderer warm-up failed: {e}")
 
-        video_files = list(media_path.glob("*.mp4"))
 
-        if not video_files:
-            raise Exception(f"No video file generated by manim in {media_path}")
+def start_renderer_warm_up():
+    """Warm up the template renderer in the background when it is in use"""
+    global warm_up_task
+    if VIDEO_RENDERER == "template":
+        warm_up_task = asyncio.create_task(warm_up_template_renderer())
 
-        generated_video = video_files[0]
-        print(f"📹 Found generated video with voiceover: {generated_video}")
 
-        # Create destination directory
-        video_dir = Path("static/videos") / str(course_id)
-        video_dir.mkdir(parents=True, exist_ok=True)
+async def stop_renderer_warm_up():
+    global warm_up_task
+    task = warm_up_task
+    warm_up_task = None
+    if task:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
 
-        # Crop the video to remove 1px black border using ffmpeg
-        final_video = video_dir / f"{module_index}.mp4"
-        print(f"✂️ Cropping video to remove black border...")
 
-        crop_process = await asyncio.create_subprocess_exec(
-            "ffmpeg",
-            "-i", str(generated_video),
-            "-vf", "crop=iw-3:ih-2:2:1",  # Crop 2px from left, 1px from right/top/bottom
-            "-c:a", "copy",  # Copy audio without re-encoding
-            "-y",  # Overwrite output file
-            str(final_video),
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
+# Modules generated scenes may import; anything else (os, subprocess, requests, ...) is rejected
+ALLOWED_IMPORTS = {"manim", "manim_voiceover", "numpy", "math", "random", "itertools", "functools", "colour", "typing"}
+BANNED_CALLS = {"exec", "eval", "compile", "open", "__import__", "input", "breakpoint"}
 
-        stdout, stderr = await crop_process.communicate()
 
-        if crop_process.returncode != 0:
-            print(f"⚠️ FFmpeg crop failed, falling back to uncropped video: {stderr.decode()}")
-            shutil.copy2(generated_video, final_video)
+def validate_manim_code(manim_code: str) -> list[str]:
+    """
+    Statically check generated scene code before handing it to manim
+
+    Returns:
+        A list of problems, empty when the code looks renderable
+    """
+    try:
+        tree = ast.parse(manim_code)
+    except SyntaxError as e:
+        return [f"syntax error on line {e.lineno}: {e.msg}"]
+
+    problems = []
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            modules = [node.module or ""]
+        else:
+            modules = []
+        for module in modules:
+            if module.split(".")[0] not in ALLOWED_IMPORTS:
+                problems.append(f"import of '{module}' is not allowed")
+
+        if isinstance(node, ast.Call):
+            if isinstance(node.func, ast.Name) and node.func.id in BANNED_CALLS:
+                problems.append(f"call to {node.func.id}() is not allowed")
+            elif isinstance(node.func, ast.Attribute) and node.func.attr == "voiceover":
+                text = next((keyword.value for keyword in node.keywords if keyword.arg == "text"), None)
+                if text is None and node.args:
+                    text = node.args[0]
+                if text is None:
+                    problems.append(f"voiceover on line {node.lineno} has no text")
+                elif isinstance(text, ast.Constant) and not str(text.value).strip():
+                    problems.append(f"voiceover on line {node.lineno} has empty text")
+
+    scenes = {
+        node.name: node
+        for node in tree.body
+        if isinstance(node, ast.ClassDef) and re.fullmatch(r"Section\d+|LessonScene", node.name)
+    }
+    if not scenes:
+        problems.append("no Section1, Section2, ... scene classes defined")
+    for name, scene in scenes.items():
+        bases = [base.id for base in scene.bases if isinstance(base, ast.Name)]
+        if "VoiceoverScene" not in bases:
+            problems.append(f"{name} must inherit from VoiceoverScene")
+        construct = next((item for item in scene.body if isinstance(item, ast.FunctionDef) and item.name == "construct"), None)
+        if construct is None:
+            problems.append(f"{name} has no construct() method")
+        # A section without audio has no audio stream, and the concat in finalize_video
+        # takes its streams from the first section: a silent Section1 mutes the whole video
+        elif not any(
+            isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "voiceover"
+            for node in ast.walk(construct)
+        ):
+            problems.append(f"{name}.construct() never calls self.voiceover(), so the section has no narration")
+
+    return problems
+
+
+def video_file_name(module_index: int, quality: str, digest: str) -> str:
+    # Named after its bytes, so a URL never points at different content and can be cached for good (see utils/video_files.py)
+    return f"{module_index}-{quality}-{digest[:12]}.mp4"
+
+
+async def execute_manim_code(course_id: int, module_index: int, manim_code: str, priority: int = INTERACTIVE, quality: str = "low") -> tuple[str, dict]:
+    """
+    Execute manim code with voiceover plugin (audio generation and syncing handled by plugin)
+
+    Every SectionN scene renders in its own manim process, concurrently, and
+    the section videos are joined with ffmpeg's concat demuxer. Each process
+    holds a render scheduler slot so the number of concurrent manim/ffmpeg
+    processes stays bounded, and runs under the limits of utils/render_sandbox.py.
+
+    Returns:
+        (path of the video, render stats from render_sandbox.combine_stats)
+    """
+    try:
+        # Scratch space for the scene file and every section's media_dir
+        with render_temp_dir() as temp_path:
+            scene_file = temp_path / "scene.py"
+
+            # Write manim code to file
+            print(f"📄 Writing manim scene to {scene_file}")
+            scene_file.write_text(SCENE_PRELUDE + manim_code)
+
+            # Execute manim with voiceover to render every section (async subprocesses)
+            scene_names = find_scene_names(manim_code)
+            print(f"🎬 Running manim renderer with voiceover for {len(scene_names)} scene(s)...")
+            sections = await render_scenes(course_id, module_index, priority, quality, scene_file, scene_names)
+            section_videos = [video for video, _ in sections]
+            print(f"✅ Manim rendering with voiceover completed successfully")
+
+            # Create destination directory
+            video_dir = Path("static/videos") / str(course_id)
+            video_dir.mkdir(parents=True, exist_ok=True)
+
+            # Written next to the final path and renamed into place once its
+            # content hash, and so its name, is known
+            finished_video = video_dir / f".{module_index}-{quality}.tmp.mp4"
+            async with render_scheduler.slot(course_id, priority, lesson_job(course_id, module_index, quality)):
+                finalize_stats = await finalize_video(section_videos, finished_video, temp_path)
+            digest = await asyncio.to_thread(render_cache.file_digest, finished_video)
+            final_video = video_dir / video_file_name(module_index, quality, digest)
+            # Poster and thumbnails are named after the video they belong to
+            for suffix in render_cache.VIDEO_SIDECARS:
+                image = render_cache.sidecar(finished_video, suffix)
+                if image.exists():
+                    os.replace(image, render_cache.sidecar(final_video, suffix))
+            os.replace(finished_video, final_video)
 
         # Verify final video exists
         if not final_video.exists():
@@ -260,17 +755,148 @@ async def execute_manim_code(course_id: int, module_index: int, manim_code: str)
 
         print(f"✅ Video with voiceover complete: {final_video}")
 
-        return str(final_video)
+        return str(final_video), combine_stats(quality, [stats for _, stats in sections] + [finalize_stats])
 
     except Exception as e:
         error_msg = f"Failed to execute manim: {str(e)}"
         print(f"❌ {error_msg}")
         raise Exception(error_msg)
-    finally:
-        # Clean up temp directory
-        if temp_dir and os.path.exists(temp_dir):
-            try:
-                shutil.rmtree(temp_dir)
-                print(f"🗑️ Cleaned up temporary directory")
-            except Exception as e:
-                print(f"⚠️ Could not clean up temp directory: {e}")
+
+
+def find_scene_names(manim_code: str) -> list[str]:
+    """Section scenes in playback order, or the single LessonScene of older code"""
+    sections = re.findall(r"^class\s+(Section(\d+))\s*\(", manim_code, re.MULTILINE)
+    if not sections:
+        return ["LessonScene"]
+    return [name for name, _ in sorted(sections, key=lambda section: int(section[1]))]
+
+
+def render_env() -> dict:
+    """Environment for manim processes: importable utils and an absolute cache location"""
+    python_path = [str(BACKEND_DIR), os.environ.get("PYTHONPATH", "")]
+    return {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(filter(None, python_path)),
+        "RENDER_CACHE_DIR": str(render_cache.CACHE_DIR.resolve()),
+    }
+
+
+async def render_scenes(course_id: int, module_index: int, priority: int, quality: str, scene_file: Path, scene_names: list[str]) -> list[tuple[Path, dict | None]]:
+    """Render every scene concurrently; if one fails, stop the others"""
+    tasks = [
+        asyncio.ensure_future(render_scene(course_id, module_index, priority, quality, scene_file, scene_name))
+        for scene_name in scene_names
+    ]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def render_scene(course_id: int, module_index: int, priority: int, quality: str, scene_file: Path, scene_name: str) -> tuple[Path, dict | None]:
+    """Render one scene; returns its video and the manim process's stats"""
+    # Separate media dirs, since manim-voiceover's audio cache is not safe to share between processes
+    media_dir = scene_file.parent / "media" / scene_name
+
+    async with render_scheduler.slot(course_id, priority, lesson_job(course_id, module_index, quality)):
+        try:
+            # Killed with its whole process group on timeout, when a sibling section fails or when the course is deleted
+            returncode, stdout, stderr, stats = await run_sandboxed(
+                scene_file.parent / f"{scene_name}-stats.json",
+                "manim",
+                *RENDER_QUALITIES[quality],
+                "--format=mp4",
+                "--background_color", BACKGROUND_COLOR,
+                "--media_dir",
+                str(media_dir),
+                str(scene_file),
+                scene_name,
+                timeout=300,
+                cwd=str(scene_file.parent),
+                env=render_env()
+            )
+        except asyncio.TimeoutError:
+            raise Exception(f"Manim rendering of {scene_name} timed out after 5 minutes")
+
+    if returncode != 0:
+        error_msg = f"Manim rendering of {scene_name} failed:\nSTDOUT: {stdout.decode()}\nSTDERR: {stderr.decode()}"
+        print(f"❌ {error_msg}")
+        raise Exception(error_msg)
+
+    # Find the generated video file (with audio already embedded by manim-voiceover);
+    # its folder is named after the resolution and frame rate, e.g. videos/scene/480p15
+    video_file = next((media_dir / "videos").rglob(f"{scene_name}.mp4"), None)
+    if video_file is None:
+        raise Exception(f"No video file generated by manim in {media_dir}")
+
+    return video_file, stats
+
+
+async def finalize_video(videos: list[Path], output: Path, work_dir: Path) -> dict | None:
+    """
+    Join the section videos into one faststart MP4 in a single ffmpeg pass
+
+    Streams are copied, so this is a remux rather than a re-encode unless
+    VIDEO_CROP asks for a crop. The same pass writes a poster frame and a
+    thumbnail sprite next to output (see render_cache.VIDEO_SIDECARS); a
+    video too short for a poster simply has none.
+
+    Returns:
+        The ffmpeg process's stats (see utils/render_sandbox.py)
+    """
+    if len(videos) == 1:
+        source = ["-i", str(videos[0])]
+    else:
+        # Sections share encoding settings, so the concat demuxer can join them as-is
+        concat_list = work_dir / "sections.txt"
+        concat_list.write_text("".join(f"file '{video.resolve()}'\n" for video in videos))
+        source = ["-f", "concat", "-safe", "0", "-i", str(concat_list)]
+    # Input 1 is the same video with only keyframes decoded, for the sprite: manim starts every
+    # animation on a keyframe, and decoding every frame would cost far more than the remux
+    inputs = [*source, "-skip_frame", "nokey", *source]
+
+    if VIDEO_CROP:
+        codecs = ["-vf", f"crop={VIDEO_CROP}", "-c:a", "copy"]
+        crop = f"crop={VIDEO_CROP},"
+    else:
+        codecs = ["-c", "copy"]
+        crop = ""
+
+    poster = render_cache.sidecar(output, render_cache.POSTER_SUFFIX)
+    thumbnails = render_cache.sidecar(output, render_cache.THUMBNAILS_SUFFIX)
+    # Never pass off images from an earlier attempt as this video's
+    poster.unlink(missing_ok=True)
+    thumbnails.unlink(missing_ok=True)
+
+    returncode, stdout, stderr, stats = await run_sandboxed(
+        work_dir / "finalize-stats.json",
+        "ffmpeg",
+        *inputs,
+        "-map", "0",
+        *codecs,
+        "-movflags", "+faststart",  # moov atom first, so playback starts before the download finishes
+        "-y",
+        str(output),
+        "-map", "0:v",
+        "-vf", f"{crop}select='gte(t,{POSTER_SECONDS})'",
+        "-frames:v", "1", "-q:v", "3",
+        "-y",
+        str(poster),
+        "-map", "1:v",
+        "-vf", f"{crop}fps=1/{THUMBNAIL_INTERVAL},scale={THUMBNAIL_WIDTH}:-2,tile={THUMBNAIL_GRID}:color={BACKGROUND_COLOR}",
+        "-frames:v", "1", "-q:v", "5",
+        "-y",
+        str(thumbnails),
+        env=render_env()
+    )
+
+    if returncode != 0:
+        output.unlink(missing_ok=True)
+        poster.unlink(missing_ok=True)
+        thumbnails.unlink(missing_ok=True)
+        raise Exception(f"FFmpeg post-processing failed: {stderr.decode()}")
+
+    return stats
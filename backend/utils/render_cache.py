@@ -0,0 +1,108 @@
+import os
+import uuid
+import shutil
+import hashlib
+from pathlib import Path
+
+# Lives next to static/videos (same volume) so cached MP4s can be hard-linked into place
+CACHE_DIR = Path(os.getenv("RENDER_CACHE_DIR", "static/render_cache"))
+
+# Images stored next to a video as <video stem><suffix>, here and in static/videos
+POSTER_SUFFIX = ".jpg"
+THUMBNAILS_SUFFIX = "-thumbs.jpg"
+VIDEO_SIDECARS = (POSTER_SUFFIX, THUMBNAILS_SUFFIX)
+
+
+def content_hash(*parts: str) -> str:
+    """Stable sha256 key for a sequence of text inputs"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def file_digest(path: Path) -> str:
+    """sha256 of a file's bytes"""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def entry_path(kind: str, key: str, suffix: str) -> Path:
+    # Shard by the first two hex digits to keep directories small
+    return CACHE_DIR / kind / key[:2] / f"{key}{suffix}"
+
+
+def write_atomic(path: Path, write):
+    """Write into a sibling temp file and rename it over path"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        write(temp)
+        os.replace(temp, path)
+    finally:
+        temp.unlink(missing_ok=True)
+
+
+def get_text(kind: str, key: str) -> str | None:
+    """Cached LLM output ("narration" or "scenes"), or None on a miss"""
+    try:
+        return entry_path(kind, key, ".txt").read_text()
+    except FileNotFoundError:
+        return None
+
+
+def put_text(kind: str, key: str, text: str):
+    # Stored as .txt, not .py, so uvicorn --reload never picks up scene code
+    write_atomic(entry_path(kind, key, ".txt"), lambda temp: temp.write_text(text))
+
+
+def discard(kind: str, key: str):
+    """Forget a cached LLM output, e.g. scene code that failed to render"""
+    entry_path(kind, key, ".txt").unlink(missing_ok=True)
+
+
+def sidecar(video: Path, suffix: str) -> Path:
+    return video.with_name(video.stem + suffix)
+
+
+def get_video(key: str) -> Path | None:
+    path = entry_path("videos", key, ".mp4")
+    return path if path.exists() else None
+
+
+def put_video(key: str, video: Path):
+    """Store a finished video and its images under its key, sharing the files when possible"""
+    cached = entry_path("videos", key, ".mp4")
+    for suffix in VIDEO_SIDECARS:
+        image = sidecar(video, suffix)
+        if image.exists():
+            write_atomic(sidecar(cached, suffix), lambda temp: link_or_copy(image, temp))
+    # Last, so a cached video never misses images it was rendered with
+    write_atomic(cached, lambda temp: link_or_copy(video, temp))
+
+
+def link_video(key: str, destination: Path) -> bool:
+    """Place the cached video for key (and its images) at destination; False on a miss"""
+    cached = get_video(key)
+    if cached is None:
+        return False
+    # Replace rather than overwrite so other links to the old file are untouched
+    try:
+        for suffix in VIDEO_SIDECARS:
+            image = sidecar(cached, suffix)
+            if image.exists():
+                write_atomic(sidecar(destination, suffix), lambda temp: link_or_copy(image, temp))
+        write_atomic(destination, lambda temp: link_or_copy(cached, temp))
+    except FileNotFoundError:
+        # Evicted by the storage sweep since get_video()
+        return False
+    return True
+
+
+def link_or_copy(source: Path, destination: Path):
+    try:
+        os.link(source, destination)
+    except OSError:
+        # Different filesystem or no hard link support
+        shutil.copy2(source, destination)
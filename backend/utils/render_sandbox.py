@@ -0,0 +1,166 @@
+"""
+Resource limits and accounting for render processes
+
+manim runs LLM-written scene code, so every manim and ffmpeg process is
+started through this module:
+
+    python -m utils.render_sandbox --stats <file> -- <command> [args...]
+
+The runner lowers its rlimits (inherited by the command and everything
+it spawns), runs the command, and writes what it cost to <file> as JSON:
+CPU seconds of all its processes and the peak RSS of the largest one.
+It exits with the command's exit code.
+"""
+import os
+import sys
+import json
+import signal
+import resource
+import argparse
+import subprocess
+from pathlib import Path
+from utils.task_registry import run_process
+
+# 0 disables a limit
+# CPU time per process (user + system), in seconds
+RENDER_CPU_SECONDS = int(os.getenv("RENDER_CPU_SECONDS") or "600")
+# Address space per process, in MB
+RENDER_MEMORY_MB = int(os.getenv("RENDER_MEMORY_MB") or "4096")
+# Largest file a render may write, in MB
+RENDER_FILE_SIZE_MB = int(os.getenv("RENDER_FILE_SIZE_MB") or "2048")
+# Processes per user; this counts every process of the backend's user, so only
+# set it when renders run as a dedicated user
+RENDER_MAX_PROCESSES = int(os.getenv("RENDER_MAX_PROCESSES") or "0")
+
+# Seconds past RENDER_CPU_SECONDS (SIGXCPU) before the kernel sends SIGKILL
+CPU_GRACE_SECONDS = 5
+# Signals the kernel sends when a limit is hit
+LIMIT_SIGNALS = {signal.SIGXCPU: "cpu", signal.SIGXFSZ: "file_size"}
+
+# Totals over every render of this process
+render_usage = {"renders": 0, "cpu_seconds": 0.0, "max_cpu_seconds": 0.0, "max_peak_rss_mb": 0.0, "limits_hit": 0}
+
+
+def limits() -> dict[int, int]:
+    """rlimit -> value for every configured limit"""
+    configured = {
+        resource.RLIMIT_CPU: RENDER_CPU_SECONDS,
+        resource.RLIMIT_AS: RENDER_MEMORY_MB * 1024 * 1024,
+        resource.RLIMIT_FSIZE: RENDER_FILE_SIZE_MB * 1024 * 1024,
+        resource.RLIMIT_NPROC: RENDER_MAX_PROCESSES,
+    }
+    return {limit: value for limit, value in configured.items() if value}
+
+
+def apply_limits():
+    for limit, value in limits().items():
+        # A hard CPU limit equal to the soft one would SIGKILL instead of SIGXCPU, which could not be told apart from a kill
+        soft, hard = value, value + CPU_GRACE_SECONDS if limit == resource.RLIMIT_CPU else value
+        _, current_hard = resource.getrlimit(limit)
+        if current_hard != resource.RLIM_INFINITY:
+            soft, hard = min(soft, current_hard), min(hard, current_hard)
+        resource.setrlimit(limit, (soft, hard))
+
+
+def limit_hit(returncode: int) -> str | None:
+    """Which limit killed the command: it died of the signal, or a shell reported a child that did"""
+    for limit_signal, limit in LIMIT_SIGNALS.items():
+        if returncode in (-limit_signal, 128 + limit_signal):
+            return limit
+    return None
+
+
+def sandbox_command(stats_file: Path, *command: str) -> list[str]:
+    """command wrapped in the sandbox runner; needs the backend dir on PYTHONPATH"""
+    return [sys.executable, "-m", "utils.render_sandbox", "--stats", str(stats_file), "--", *command]
+
+
+def read_stats(stats_file: Path) -> dict | None:
+    """What a sandboxed process cost, or None if the runner did not get to write it (e.g. it was killed)"""
+    try:
+        return json.loads(stats_file.read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+async def run_sandboxed(stats_file: Path, *command: str, **kwargs) -> tuple[int, bytes, bytes, dict | None]:
+    """run_process() under the render limits; also returns the command's stats"""
+    returncode, stdout, stderr = await run_process(*sandbox_command(stats_file, *command), **kwargs)
+    stats = read_stats(stats_file)
+    if stats is not None and stats["limit"]:
+        render_usage["limits_hit"] += 1
+    return returncode, stdout, stderr, stats
+
+
+def combine_stats(quality: str, processes: list[dict | None]) -> dict:
+    """
+    One render's cost from its processes' stats
+
+    CPU seconds add up; peak RSS is the largest single process, since
+    sections run concurrently on whatever render slots are free.
+    """
+    processes = [stats for stats in processes if stats is not None]
+    return {
+        "quality": quality,
+        "processes": len(processes),
+        "cpu_seconds": round(sum(stats["cpu_seconds"] for stats in processes), 2),
+        "peak_rss_mb": max((stats["peak_rss_mb"] for stats in processes), default=0.0),
+    }
+
+
+def record_render(stats: dict):
+    render_usage["renders"] += 1
+    render_usage["cpu_seconds"] += stats["cpu_seconds"]
+    render_usage["max_cpu_seconds"] = max(render_usage["max_cpu_seconds"], stats["cpu_seconds"])
+    render_usage["max_peak_rss_mb"] = max(render_usage["max_peak_rss_mb"], stats["peak_rss_mb"])
+
+
+def sandbox_metrics() -> dict:
+    renders = render_usage["renders"]
+    return {
+        "renders": renders,
+        "avg_cpu_seconds": round(render_usage["cpu_seconds"] / renders, 2) if renders else 0.0,
+        "max_cpu_seconds": round(render_usage["max_cpu_seconds"], 2),
+        "max_peak_rss_mb": render_usage["max_peak_rss_mb"],
+        "limits_hit": render_usage["limits_hit"],
+        "limits": {
+            "cpu_seconds": RENDER_CPU_SECONDS,
+            "memory_mb": RENDER_MEMORY_MB,
+            "file_size_mb": RENDER_FILE_SIZE_MB,
+            "max_processes": RENDER_MAX_PROCESSES,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a render command under resource limits")
+    parser.add_argument("--stats", required=True, help="file to write the command's resource usage to")
+    parser.add_argument("command", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+
+    apply_limits()
+    # The runner itself must not die of SIGXFSZ before it can report
+    signal.signal(signal.SIGXFSZ, signal.SIG_IGN)
+    try:
+        returncode = subprocess.run(command, preexec_fn=lambda: signal.signal(signal.SIGXFSZ, signal.SIG_DFL)).returncode
+    except OSError as e:
+        print(f"render_sandbox: could not start {command[0]}: {e}", file=sys.stderr)
+        returncode = 127
+
+    # Covers every process the command spawned and waited for
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    limit = limit_hit(returncode)
+    if limit:
+        print(f"render_sandbox: {Path(command[0]).name} exceeded its {limit} limit", file=sys.stderr)
+    Path(args.stats).write_text(json.dumps({
+        "cpu_seconds": round(usage.ru_utime + usage.ru_stime, 2),
+        "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),  # KiB on Linux
+        "returncode": returncode,
+        "limit": limit,
+    }))
+    sys.exit(128 - returncode if returncode < 0 else returncode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import os
+import time
+import asyncio
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Hashable
+
+# Render priorities (lower runs first)
+INTERACTIVE = 0  # A learner is waiting on this video
+PREFETCH = 1  # Background prefetch of lessons nobody has opened yet
+UPGRADE = 2  # Higher quality re-render of a video that already has a preview
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", PREFETCH: "prefetch", UPGRADE: "upgrade"}
+
+
+def lesson_job(course_id: int, module_index: int, quality: str) -> tuple:
+    """Job key for every slot one lesson video render takes"""
+    return ("lesson", course_id, module_index, quality)
+
+
+class RenderScheduler:
+    """
+    Bounded pool of render slots shared by every manim/ffmpeg job in the process
+
+    Waiters are served strictly by priority. Within a priority, the course
+    with the fewest renders already running goes next, and ties rotate
+    round-robin, so one large course cannot starve the others.
+
+    Slots can be requested for a job (e.g. one lesson's render); promote()
+    raises the priority of a job's queued and later requests, for when a
+    learner opens a lesson that was only being prefetched.
+    """
+
+    def __init__(self, slots: int):
+        self.slots = slots
+        self.active = 0
+        self.active_by_course: Counter[int] = Counter()
+        # priority -> course_id -> FIFO of (waiting future, job)
+        self.queues: dict[int, OrderedDict[int, deque[tuple[asyncio.Future, Hashable]]]] = {}
+        # job -> priority it was promoted to
+        self.job_priorities: dict[Hashable, int] = {}
+        self.started = 0
+        self.completed = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.total_render_seconds = 0.0
+
+    @asynccontextmanager
+    async def slot(self, course_id: int, priority: int = INTERACTIVE, job: Hashable | None = None):
+        """Hold one render slot for the duration of the block"""
+        priority = min(priority, self.job_priorities.get(job, priority))
+        queued_at = time.monotonic()
+        if self.active < self.slots and not self.queue_depth():
+            self._acquire(course_id)
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self.queues.setdefault(priority, OrderedDict()).setdefault(course_id, deque()).append((waiter, job))
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # Granted and cancelled in the same tick: hand the slot on
+                if waiter.done() and not waiter.cancelled():
+                    self._release(course_id)
+                raise
+
+        waited = time.monotonic() - queued_at
+        self.started += 1
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.completed += 1
+            self.total_render_seconds += time.monotonic() - started_at
+            self._release(course_id)
+
+    def promote(self, job: Hashable, priority: int):
+        """Serve job's waiting and future slot requests at priority, unless they already run at a higher one"""
+        if priority >= self.job_priorities.get(job, priority + 1):
+            return
+        self.job_priorities[job] = priority
+        for queued_priority in [queued for queued in self.queues if queued > priority]:
+            courses = self.queues[queued_priority]
+            for course_id in list(courses):
+                promoted = [entry for entry in courses[course_id] if entry[1] == job]
+                if not promoted:
+                    continue
+                courses[course_id] = deque(entry for entry in courses[course_id] if entry[1] != job)
+                if not courses[course_id]:
+                    del courses[course_id]
+                self.queues.setdefault(priority, OrderedDict()).setdefault(course_id, deque()).extend(promoted)
+
+    def finish_job(self, job: Hashable):
+        """Forget a job's promotion once it is done"""
+        self.job_priorities.pop(job, None)
+
+    def _acquire(self, course_id: int):
+        self.active += 1
+        self.active_by_course[course_id] += 1
+
+    def _release(self, course_id: int):
+        self.active -= 1
+        self.active_by_course[course_id] -= 1
+        if self.active_by_course[course_id] <= 0:
+            del self.active_by_course[course_id]
+        self._dispatch()
+
+    def _dispatch(self):
+        """Hand free slots to the next waiters"""
+        while self.active < self.slots:
+            next_waiter = self._next_waiter()
+            if next_waiter is None:
+                return
+            waiter, course_id = next_waiter
+            self._acquire(course_id)
+            waiter.set_result(None)
+
+    def _next_waiter(self) -> tuple[asyncio.Future, int] | None:
+        for priority in sorted(self.queues):
+            courses = self.queues[priority]
+            while courses:
+                # Fewest running renders first; min() keeps queue order for ties
+                course_id = min(courses, key=lambda queued: self.active_by_course[queued])
+                waiters = courses[course_id]
+                waiter, _ = waiters.popleft()
+                if waiters:
+                    courses.move_to_end(course_id)  # Rotate for round-robin
+                else:
+                    del courses[course_id]
+                if not waiter.cancelled():
+                    return waiter, course_id
+        return None
+
+    def queue_depth(self) -> int:
+        return sum(
+            1
+            for courses in self.queues.values()
+            for waiters in courses.values()
+            for waiter, _ in waiters
+            if not waiter.cancelled()
+        )
+
+    def metrics(self) -> dict:
+        queued = {
+            PRIORITY_NAMES.get(priority, str(priority)): sum(
+                1 for waiters in courses.values() for waiter, _ in waiters if not waiter.cancelled()
+            )
+            for priority, courses in sorted(self.queues.items())
+        }
+        return {
+            "slots": self.slots,
+            "active": self.active,
+            "active_by_course": dict(self.active_by_course),
+            "queue_depth": sum(queued.values()),
+            "queued_by_priority": queued,
+            "started": self.started,
+            "completed": self.completed,
+            "avg_wait_seconds": round(self.total_wait_seconds / self.started, 3) if self.started else 0.0,
+            "max_wait_seconds": round(self.max_wait_seconds, 3),
+            "avg_render_seconds": round(self.total_render_seconds / self.completed, 3) if self.completed else 0.0,
+        }
+
+
+render_scheduler = RenderScheduler(
+    slots=int(os.getenv("RENDER_SLOTS") or max(1, (os.cpu_count() or 2) // 2))
+)
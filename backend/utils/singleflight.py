@@ -0,0 +1,42 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one execution
+
+    The first caller starts the work as a task; everyone who asks for the
+    same key while it is running awaits that task instead of starting their
+    own. Cancelling one waiter never cancels the shared work.
+    """
+
+    def __init__(self):
+        self.tasks: dict[Hashable, asyncio.Task] = {}
+
+    def start(self, key: Hashable, fn: Callable[..., Awaitable], *args) -> asyncio.Task:
+        """Start fn(*args) in the background unless a call for key is already in flight"""
+        task = self.tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args))
+            self.tasks[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return task
+
+    def do(self, key: Hashable, fn: Callable[..., Awaitable], *args) -> Awaitable:
+        """Run fn(*args) unless a call for key is already in flight, and await its result"""
+        return asyncio.shield(self.start(key, fn, *args))
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self.tasks
+
+    def forget(self, key: Hashable):
+        """Let the next caller start fresh work even if a call is still running"""
+        self.tasks.pop(key, None)
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self.tasks.get(key) is task:
+            del self.tasks[key]
+        # Mark the exception as retrieved even if every waiter went away
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,333 @@
+import os
+import time
+import shutil
+import asyncio
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from database import get_db_pool
+from utils import render_cache
+from utils.course_events import notify_course_event
+
+VIDEOS_DIR = Path("static/videos")
+
+# Upper bound for lesson videos plus cached renders, in MB (0 = unlimited)
+VIDEO_STORAGE_QUOTA_MB = int(os.getenv("VIDEO_STORAGE_QUOTA_MB") or "0")
+STORAGE_SWEEP_SECONDS = int(os.getenv("STORAGE_SWEEP_SECONDS") or "300")
+# Temp dirs and unreferenced files younger than this may belong to a render still running in another process
+STALE_FILE_SECONDS = int(os.getenv("STALE_FILE_SECONDS") or str(2 * 60 * 60))
+
+RENDER_TEMP_PREFIX = "manim-render-"
+# pg advisory lock key, so only one backend process sweeps at a time
+SWEEP_LOCK_ID = 4_044_001
+
+# Render temp dirs in use by this process
+active_temp_dirs: set[Path] = set()
+# (course_id, module_index) -> time.monotonic() of the latest view not yet written to video_storage
+pending_accesses: dict[tuple[int, int], float] = {}
+last_sweep: dict = {}
+sweep_task: asyncio.Task | None = None
+
+
+@contextmanager
+def render_temp_dir():
+    """Scratch directory for one render, removed afterwards (or by the sweep if the process dies)"""
+    path = Path(tempfile.mkdtemp(prefix=RENDER_TEMP_PREFIX))
+    active_temp_dirs.add(path)
+    try:
+        yield path
+    finally:
+        active_temp_dirs.discard(path)
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def record_access(course_id: int, module_index: int):
+    """Note that a lesson was viewed; written to the database on the next sweep"""
+    pending_accesses[(course_id, module_index)] = time.monotonic()
+
+
+def url_to_path(url: str | None) -> Path | None:
+    if url and url.startswith("/videos/"):
+        return VIDEOS_DIR / url.removeprefix("/videos/")
+    return None
+
+
+async def remove_course_videos(course_id: int):
+    """Delete every file of a course (after the course itself was deleted)"""
+    await asyncio.to_thread(shutil.rmtree, VIDEOS_DIR / str(course_id), True)
+
+
+async def flush_accesses(connection):
+    if not pending_accesses:
+        return
+    now = time.monotonic()
+    accesses = [(course_id, module_index, now - viewed) for (course_id, module_index), viewed in pending_accesses.items()]
+    pending_accesses.clear()
+    # Timestamps come from the database clock, like updated_at
+    await connection.executemany(
+        """
+        INSERT INTO video_storage (course_id, module_index, accessed_at)
+        SELECT course_id, module_index, CURRENT_TIMESTAMP - make_interval(secs => $3)
+        FROM module_lessons
+        WHERE course_id = $1 AND module_index = $2
+        ON CONFLICT (course_id, module_index)
+        DO UPDATE SET accessed_at = GREATEST(video_storage.accessed_at, EXCLUDED.accessed_at)
+        """,
+        accesses
+    )
+
+
+def remove_stale_files(course_ids: set[int], newest_course: int, referenced: set[Path]) -> dict:
+    """
+    Delete files no lesson points to any more
+
+    Course directories of deleted courses go at once. Anything else
+    (superseded previews, half-written temp files, render temp dirs left by
+    a killed process) only once it is older than STALE_FILE_SECONDS.
+    """
+    cutoff = time.time() - STALE_FILE_SECONDS
+    removed = {"course_dirs": 0, "files": 0, "temp_dirs": 0, "bytes": 0}
+
+    def is_stale(path: Path) -> bool:
+        # A lesson file hard-linked from the render cache keeps the cached render's old
+        # mtime; linking it (and the rename into place) updates ctime
+        try:
+            stat = path.stat()
+            return max(stat.st_mtime, stat.st_ctime) < cutoff
+        except FileNotFoundError:
+            return False
+
+    def unlink(path: Path):
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return
+        removed["files"] += 1
+        removed["bytes"] += size
+
+    course_dirs = [path for path in VIDEOS_DIR.iterdir() if path.is_dir() and path.name.isdigit()] if VIDEOS_DIR.exists() else []
+    for course_dir in course_dirs:
+        course_id = int(course_dir.name)
+        # Ids are never reused; anything newer was created after course_ids was read
+        if course_id not in course_ids and course_id <= newest_course:
+            removed["bytes"] += sum(path.stat().st_size for path in course_dir.rglob("*") if path.is_file())
+            shutil.rmtree(course_dir, ignore_errors=True)
+            removed["course_dirs"] += 1
+            continue
+        for path in course_dir.iterdir():
+            if path.is_file() and path not in referenced and is_stale(path):
+                unlink(path)
+
+    for path in render_cache.CACHE_DIR.rglob(".*.tmp"):
+        if is_stale(path):
+            unlink(path)
+
+    for path in Path(tempfile.gettempdir()).glob(f"{RENDER_TEMP_PREFIX}*"):
+        if path not in active_temp_dirs and is_stale(path):
+            shutil.rmtree(path, ignore_errors=True)
+            removed["temp_dirs"] += 1
+
+    return removed
+
+
+def scan_video_usage() -> dict[tuple[int, int], dict]:
+    """
+    Every lesson video and cached render on disk, grouped by inode
+
+    Lesson videos are usually hard links to a cached render, so bytes are
+    only freed once every link to the inode is gone.
+    """
+    usage = {}
+
+    def add(path: Path, kind: str):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return
+        entry = usage.setdefault((stat.st_dev, stat.st_ino), {
+            "bytes": stat.st_size, "mtime": stat.st_mtime, "lesson_files": set(), "cache_files": [],
+        })
+        if kind == "lesson":
+            entry["lesson_files"].add(path)
+        else:
+            entry["cache_files"].append(path)
+
+    for path in VIDEOS_DIR.glob("*/*.mp4"):
+        if not path.name.startswith("."):
+            add(path, "lesson")
+    for path in (render_cache.CACHE_DIR / "videos").glob("*/*.mp4"):
+        add(path, "cache")
+    return usage
+
+
+async def enforce_quota(connection, lessons: list, usage: dict) -> tuple[int, int]:
+    """
+    Delete renders until usage fits VIDEO_STORAGE_QUOTA_MB
+
+    Cached renders no lesson shows go first, oldest first; then the least
+    recently viewed lesson videos, which are marked 'evicted' and rendered
+    again the next time someone opens the lesson.
+
+    Returns:
+        (bytes in use afterwards, lessons evicted)
+    """
+    used_bytes = sum(entry["bytes"] for entry in usage.values())
+    quota_bytes = VIDEO_STORAGE_QUOTA_MB * 1024 * 1024
+    if not quota_bytes or used_bytes <= quota_bytes:
+        return used_bytes, 0
+
+    def drop_cached(entry: dict):
+        nonlocal used_bytes
+        for path in entry["cache_files"]:
+            path.unlink(missing_ok=True)
+            for suffix in render_cache.VIDEO_SIDECARS:
+                render_cache.sidecar(path, suffix).unlink(missing_ok=True)
+        entry["cache_files"] = []
+        used_bytes -= entry["bytes"]
+
+    for entry in sorted((entry for entry in usage.values() if not entry["lesson_files"]), key=lambda entry: entry["mtime"]):
+        if used_bytes <= quota_bytes:
+            return used_bytes, 0
+        drop_cached(entry)
+
+    entries_by_file = {path: entry for entry in usage.values() for path in entry["lesson_files"]}
+    evicted = 0
+    # lessons is ordered least recently viewed first
+    for lesson in lessons:
+        if used_bytes <= quota_bytes:
+            break
+        path = url_to_path(lesson['video_url'])
+        entry = entries_by_file.get(path)
+        if lesson['video_status'] != 'completed' or entry is None:
+            continue
+        # Skip lessons that changed since they were read (retried, upgraded, ...)
+        marked = await connection.fetchval(
+            """
+            UPDATE module_lessons
+            SET video_status = 'evicted', video_url = NULL, poster_url = NULL, thumbnail_url = NULL
+            WHERE course_id = $1 AND module_index = $2 AND video_status = 'completed' AND video_url = $3
+            RETURNING id
+            """,
+            lesson['course_id'], lesson['module_index'], lesson['video_url']
+        )
+        if not marked:
+            continue
+        await notify_course_event(connection, lesson['course_id'], "video_evicted", module_index=lesson['module_index'])
+        path.unlink(missing_ok=True)
+        evicted += 1
+        entry["lesson_files"].discard(path)
+        if not entry["lesson_files"]:
+            drop_cached(entry)
+
+    return used_bytes, evicted
+
+
+async def record_video_sizes(connection, lessons: list):
+    sizes = []
+    for lesson in lessons:
+        path = url_to_path(lesson['video_url'])
+        try:
+            size = path.stat().st_size if path else None
+        except FileNotFoundError:
+            size = None
+        sizes.append((lesson['course_id'], lesson['module_index'], size))
+    await connection.executemany(
+        """
+        INSERT INTO video_storage (course_id, module_index, video_bytes)
+        SELECT course_id, module_index, $3
+        FROM module_lessons
+        WHERE course_id = $1 AND module_index = $2
+        ON CONFLICT (course_id, module_index) DO UPDATE SET video_bytes = EXCLUDED.video_bytes
+        """,
+        sizes
+    )
+
+
+async def sweep_storage() -> dict:
+    """Record views and sizes, remove orphaned and stale files, and evict videos over the quota"""
+    db_pool = get_db_pool()
+    started = time.perf_counter()
+    async with db_pool.acquire() as connection:
+        await flush_accesses(connection)
+        if not await connection.fetchval("SELECT pg_try_advisory_lock($1)", SWEEP_LOCK_ID):
+            return last_sweep
+        try:
+            newest_course = await connection.fetchval("SELECT pg_sequence_last_value(pg_get_serial_sequence('courses', 'id'))") or 0
+            course_ids = {row['id'] for row in await connection.fetch("SELECT id FROM courses")}
+            lessons = await connection.fetch(
+                """
+                SELECT l.course_id, l.module_index, l.video_url, l.audio_url, l.poster_url, l.thumbnail_url, l.video_status,
+                       COALESCE(s.accessed_at, l.updated_at) AS accessed_at
+                FROM module_lessons l
+                LEFT JOIN video_storage s ON s.course_id = l.course_id AND s.module_index = l.module_index
+                ORDER BY accessed_at
+                """
+            )
+            referenced = {
+                path
+                for lesson in lessons
+                for field in ('video_url', 'audio_url', 'poster_url', 'thumbnail_url')
+                if (path := url_to_path(lesson[field])) is not None
+            }
+            removed = await asyncio.to_thread(remove_stale_files, course_ids, newest_course, referenced)
+            usage = await asyncio.to_thread(scan_video_usage)
+            used_bytes, evicted = await enforce_quota(connection, lessons, usage)
+            await record_video_sizes(connection, lessons)
+        finally:
+            await connection.execute("SELECT pg_advisory_unlock($1)", SWEEP_LOCK_ID)
+
+    last_sweep.clear()
+    last_sweep.update({
+        **removed,
+        "evicted_videos": evicted,
+        "used_mb": round(used_bytes / 1024 / 1024, 1),
+        "seconds": round(time.perf_counter() - started, 3),
+    })
+    if removed["course_dirs"] or removed["files"] or removed["temp_dirs"] or evicted:
+        print(
+            f"🧹 Storage sweep: removed {removed['course_dirs']} orphaned course dir(s), {removed['files']} stale file(s), "
+            f"{removed['temp_dirs']} stale temp dir(s); evicted {evicted} video(s); {last_sweep['used_mb']} MB in use"
+        )
+    return last_sweep
+
+
+def storage_stats() -> dict:
+    return {
+        "quota_mb": VIDEO_STORAGE_QUOTA_MB,
+        "active_temp_dirs": len(active_temp_dirs),
+        "pending_accesses": len(pending_accesses),
+        "last_sweep": dict(last_sweep),
+    }
+
+
+async def storage_sweep_loop():
+    while True:
+        try:
+            await sweep_storage()
+        except Exception as e:
+            print(f"⚠️ Storage sweep failed: {e}")
+        await asyncio.sleep(STORAGE_SWEEP_SECONDS)
+
+
+def start_storage_sweeper():
+    """Sweep storage now and every STORAGE_SWEEP_SECONDS"""
+    global sweep_task
+    sweep_task = asyncio.create_task(storage_sweep_loop())
+    print("✅ Storage sweeper started")
+
+
+async def stop_storage_sweeper():
+    """Stop sweeping and write out the views recorded since the last sweep"""
+    global sweep_task
+    task = sweep_task
+    sweep_task = None
+    if task:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    async with get_db_pool().acquire() as connection:
+        await flush_accesses(connection)
+    print("✅ Storage sweeper stopped")
@@ -0,0 +1,96 @@
+import os
+import signal
+import asyncio
+from typing import Coroutine
+
+# Longest delete_course waits for cancelled work to unwind
+CANCEL_WAIT_SECONDS = 10
+
+
+class TaskRegistry:
+    """
+    Background tasks grouped by course
+
+    Everything that works on a course in the background (PDF summaries,
+    module generation, prefetch, video renders) is tracked here, so deleting
+    the course can cancel all of it at once. Cancellation is cooperative:
+    tasks stop at their next await, and subprocesses started with
+    run_process() are killed on the way out.
+    """
+
+    def __init__(self):
+        self.tasks: dict[int, set[asyncio.Task]] = {}
+
+    def start(self, course_id: int, coroutine: Coroutine) -> asyncio.Task:
+        """Run coroutine in the background as work for course_id"""
+        return self.track(course_id, asyncio.ensure_future(coroutine))
+
+    def track(self, course_id: int, task: asyncio.Task) -> asyncio.Task:
+        """Register an already running task (e.g. one started by a SingleFlight); tracking twice is harmless"""
+        if not task.done():
+            self.tasks.setdefault(course_id, set()).add(task)
+            task.add_done_callback(lambda done: self._finished(course_id, done))
+        return task
+
+    def cancel(self, course_id: int) -> list[asyncio.Task]:
+        """
+        Ask every task of a course to stop; returns the cancelled tasks
+
+        They stay registered until they have actually finished, so a later
+        cancel_course() (e.g. after the course_deleted event already
+        cancelled them) still waits for them.
+        """
+        tasks = list(self.tasks.get(course_id, ()))
+        for task in tasks:
+            task.cancel()
+        return tasks
+
+    async def cancel_course(self, course_id: int) -> int:
+        """Cancel every task of a course and wait (briefly) until they have stopped"""
+        tasks = self.cancel(course_id)
+        if tasks:
+            await asyncio.wait(tasks, timeout=CANCEL_WAIT_SECONDS)
+        return len(tasks)
+
+    def metrics(self) -> dict:
+        return {
+            "courses": len(self.tasks),
+            "tasks": sum(len(tasks) for tasks in self.tasks.values()),
+        }
+
+    def _finished(self, course_id: int, task: asyncio.Task):
+        tasks = self.tasks.get(course_id)
+        if tasks is not None:
+            tasks.discard(task)
+            if not tasks:
+                del self.tasks[course_id]
+
+
+course_tasks = TaskRegistry()
+
+
+async def run_process(*args: str, timeout: float | None = None, **kwargs) -> tuple[int, bytes, bytes]:
+    """
+    Run a subprocess to completion and return (returncode, stdout, stderr)
+
+    The process gets its own process group, so on timeout (asyncio.TimeoutError)
+    or cancellation it is killed together with anything it spawned, e.g.
+    the ffmpeg and sox processes under manim.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True,
+        **kwargs
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    finally:
+        if process.returncode is None:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await process.wait()
+    return process.returncode, stdout, stderr
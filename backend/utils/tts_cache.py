@@ -0,0 +1,124 @@
+import os
+import re
+import ast
+import asyncio
+import subprocess
+from pathlib import Path
+from utils import render_cache
+
+# "gtts" calls Google Translate TTS; "local" writes placeholder audio with ffmpeg for offline testing
+TTS_BACKEND = os.getenv("TTS_BACKEND", "gtts")
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "256"))
+# Concurrent TTS requests while warming the cache for one scene
+WARM_CONCURRENCY = 4
+
+
+def normalize_text(text: str) -> str:
+    """
+    Canonical form of voiceover text, used as the cache key
+
+    Strips bookmarks with manim-voiceover's own pattern before collapsing
+    whitespace, so the server (raw scene text) and the render process (text
+    manim-voiceover already reduced) arrive at the same key.
+    """
+    text = re.sub(r"<bookmark\s*mark\s*=['\"]\w*[\"']\s*/>", "", text)
+    return " ".join(text.split())
+
+
+def synthesize(text: str, lang: str = "en", tld: str = "com") -> Path:
+    """
+    Path of the cached speech for text, synthesizing it on a miss (blocking)
+
+    Runs both in the API server (warm-up) and inside manim render processes.
+    """
+    text = normalize_text(text)
+    path = render_cache.entry_path("tts", render_cache.content_hash(TTS_BACKEND, lang, tld, text), ".mp3")
+    try:
+        # Mark as recently used for eviction
+        os.utime(path)
+        return path
+    except FileNotFoundError:
+        pass
+
+    render_cache.write_atomic(path, lambda temp: BACKENDS[TTS_BACKEND](text, lang, tld, temp))
+    return path
+
+
+def synthesize_gtts(text: str, lang: str, tld: str, output: Path):
+    from gtts import gTTS
+    gTTS(text, lang=lang, tld=tld).save(str(output))
+
+
+def synthesize_local(text: str, lang: str, tld: str, output: Path):
+    # Silence lasting roughly as long as the text takes to say (150 words per minute)
+    seconds = max(1.0, len(text.split()) / 2.5)
+    subprocess.run(
+        [
+            "ffmpeg", "-f", "lavfi", "-i", "anullsrc=r=24000:cl=mono", "-t", f"{seconds:.2f}",
+            "-codec:a", "libmp3lame", "-q:a", "9", "-f", "mp3", "-y", str(output)
+        ],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+BACKENDS = {"gtts": synthesize_gtts, "local": synthesize_local}
+
+
+def voiceover_texts(manim_code: str) -> list[str]:
+    """Literal text of every self.voiceover(...) block in the scene code"""
+    texts = []
+    for node in ast.walk(ast.parse(manim_code)):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "voiceover":
+            text = next((keyword.value for keyword in node.keywords if keyword.arg == "text"), None)
+            if text is None and node.args:
+                text = node.args[0]
+            if isinstance(text, ast.Constant) and isinstance(text.value, str) and text.value.strip():
+                texts.append(text.value)
+    return list(dict.fromkeys(texts))
+
+
+async def warm_tts_cache(texts: list[str]) -> int:
+    """
+    Synthesize a scene's voiceover texts ahead of the render, concurrently
+
+    Returns the number of voiceovers that are now cached. Failures are only
+    logged; the render process retries them itself.
+    """
+    semaphore = asyncio.Semaphore(WARM_CONCURRENCY)
+
+    async def warm(text: str) -> bool:
+        async with semaphore:
+            try:
+                await asyncio.to_thread(synthesize, text)
+                return True
+            except Exception as e:
+                print(f"⚠️ Could not pre-synthesize voiceover: {e}")
+                return False
+
+    warmed = await asyncio.gather(*(warm(text) for text in dict.fromkeys(texts)))
+    await asyncio.to_thread(evict_tts_cache)
+    return sum(warmed)
+
+
+def evict_tts_cache(max_bytes: int | None = None) -> int:
+    """Delete least recently used speech files until the cache fits its size limit"""
+    if max_bytes is None:
+        max_bytes = TTS_CACHE_MAX_MB * 1024 * 1024
+
+    entries = []
+    for path in (render_cache.CACHE_DIR / "tts").rglob("*.mp3"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    evicted = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        evicted += 1
+    return evicted
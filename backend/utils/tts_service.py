@@ -0,0 +1,40 @@
+"""
+Speech service for manim render processes
+
+Loaded by the prelude that execute_manim_code puts in front of every scene,
+never by the API server. It swaps manim-voiceover's GTTSService for a
+subclass that reads speech from the shared TTS cache, so voiceovers that
+were warmed up (or spoken in an earlier render) are not requested again.
+"""
+from pathlib import Path
+from manim_voiceover.helper import remove_bookmarks
+import manim_voiceover.services.gtts as gtts_service
+from utils import render_cache, tts_cache
+
+
+class CachedGTTSService(gtts_service.GTTSService):
+    def generate_from_text(self, text: str, cache_dir: str = None, path: str = None, **kwargs) -> dict:
+        if cache_dir is None:
+            cache_dir = self.cache_dir
+
+        input_text = remove_bookmarks(text)
+        input_data = {"input_text": input_text, "service": "gtts"}
+
+        cached_result = self.get_cached_result(input_data, cache_dir)
+        if cached_result is not None:
+            return cached_result
+
+        audio_path = path if path is not None else self.get_audio_basename(input_data) + ".mp3"
+        speech = tts_cache.synthesize(input_text, kwargs.get("lang", self.lang), kwargs.get("tld", self.tld))
+        render_cache.link_or_copy(speech, Path(cache_dir) / audio_path)
+
+        return {
+            "input_text": text,
+            "input_data": input_data,
+            "original_audio": audio_path,
+        }
+
+
+def install():
+    """Make `from manim_voiceover.services.gtts import GTTSService` return the cached service"""
+    gtts_service.GTTSService = CachedGTTSService
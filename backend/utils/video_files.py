@@ -0,0 +1,45 @@
+import os
+import re
+from pathlib import Path
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+# <module_index>-<quality or "narration">-<first 12 hex digits of the file's sha256>.<ext>,
+# or a video's poster (.jpg) and thumbnail sprite (-thumbs.jpg), which share its digest
+HASHED_NAME = re.compile(r"\d+-[a-z]+-(?P<digest>[0-9a-f]{12})(-thumbs)?\.(mp4|mp3|jpg)")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Files from before names were hashed keep their URL across re-renders
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Bytes per read; every read is a thread hop, so seeks into a video cost far fewer of them than with 64 KiB
+VIDEO_CHUNK_SIZE = int(os.getenv("VIDEO_CHUNK_SIZE") or str(1024 * 1024))
+
+
+class VideoResponse(FileResponse):
+    chunk_size = VIDEO_CHUNK_SIZE
+
+
+class VideoFiles(StaticFiles):
+    """
+    StaticFiles for static/videos
+
+    A content-hashed file never changes, so it is cached for a year as
+    immutable with its hashed name as strong ETag; Range, If-Range and 304s are
+    handled by Starlette. Whole-file responses use the server's
+    http.response.pathsend extension (sendfile) where it is offered.
+    """
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        match = HASHED_NAME.fullmatch(Path(full_path).name)
+        if match:
+            # The name carries the digest and tells a video's images apart from the video
+            headers = {"cache-control": IMMUTABLE_CACHE_CONTROL, "etag": f'"{match[0]}"'}
+        else:
+            headers = {"cache-control": REVALIDATE_CACHE_CONTROL}
+
+        response = VideoResponse(full_path, status_code=status_code, headers=headers, stat_result=stat_result)
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -62,29 +62,14 @@ export default function CourseDetail() {
     // Initial fetch
     fetchCourseData()
 
-    // Poll every 3 seconds for updates
-    const pollInterval = setInterval(async () => {
-      const result = await fetchCourseData()
+    // Refetch whenever the backend reports generation progress, and on every snapshot: it is
+    // sent after each (re)connect, so it covers anything that changed while we weren't subscribed
+    const unsubscribe = CourseService.subscribeToCourseEvents(parseInt(courseId!), () => {
+      fetchCourseData()
+    })
 
-      // Stop polling if all PDFs have summaries AND modules are completed or errored AND test questions are ready
-      if (result) {
-        const allSummariesComplete = result.pdfData.every(pdf => pdf.summary !== null)
-        const modulesStatus = result.courseData.modules_status
-
-        // Continue polling if modules are completed but test questions aren't ready yet
-        if (allSummariesComplete && modulesStatus === 'error') {
-          clearInterval(pollInterval)
-        }
-
-        // Stop when modules are completed AND test questions are available
-        if (allSummariesComplete && modulesStatus === 'completed' && hasTestQuestions === true) {
-          clearInterval(pollInterval)
-        }
-      }
-    }, 3000)
-
-    return () => clearInterval(pollInterval)
-  }, [courseId, hasTestQuestions])
+    return unsubscribe
+  }, [courseId])
 
   const handleDelete = async () => {
     if (!courseId || !confirm('Are you sure you want to delete this course?')) {
@@ -107,7 +92,7 @@ export default function CourseDetail() {
     try {
       setIsRetrying(true)
       await CourseService.retryModuleGeneration(parseInt(courseId))
-      // Polling will automatically pick up the new status
+      // The course event stream will pick up the new status
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to retry module generation')
     } finally {
@@ -25,11 +25,11 @@ export default function Courses() {
           data.map(async (course) => {
             try {
               const status = await TestService.getTestStatus(course.id)
-              const totalModules = course.modules?.length || 0
+              const totalModules = course.module_count || 0
               const completedModules = status.passed_modules.length
               progressData[course.id] = { total: totalModules, completed: completedModules }
             } catch {
-              progressData[course.id] = { total: course.modules?.length || 0, completed: 0 }
+              progressData[course.id] = { total: course.module_count || 0, completed: 0 }
             }
           })
         )
@@ -4,7 +4,7 @@ import { ArrowLeft, Loader2, PlayCircle, AlertCircle, RefreshCw, ClipboardCheck,
 import { Link, useParams } from 'react-router-dom'
 import { CourseService } from '@/services/course'
 import { TestService } from '@/services/test'
-import type { Course } from '@/services/course'
+import type { Course, VideoQuality } from '@/services/course'
 import type { TestStatus } from '@/services/test'
 import { AICoach } from '@/components/AICoach'
 import { QRCodeDialog } from '@/components/QRCodeDialog'
@@ -14,8 +14,13 @@ const API_URL = import.meta.env.VITE_BACKEND_URL || 'http://localhost:3000'
 interface ModuleLesson {
   lesson_content: string
   video_url: string | null
-  video_status: 'pending' | 'generating' | 'completed' | 'error'
+  video_status: 'pending' | 'generating' | 'completed' | 'error' | 'evicted'
   video_error?: string
+  video_quality?: VideoQuality | null
+  audio_url?: string | null
+  audio_status?: 'generating' | 'completed' | 'error' | null
+  poster_url?: string | null
+  thumbnail_url?: string | null
 }
 
 export default function ModuleLesson() {
@@ -31,6 +36,8 @@ export default function ModuleLesson() {
   const [videoProgress, setVideoProgress] = useState(0)
   const [videoDuration, setVideoDuration] = useState(0)
   const videoRef = useRef<HTMLVideoElement>(null)
+  // Playback position to restore when the preview is swapped for the upgraded video
+  const resumeRef = useRef<{ time: number; playing: boolean } | null>(null)
 
   useEffect(() => {
     // Reset state when module changes
@@ -71,17 +78,21 @@ export default function ModuleLesson() {
     // Initial fetch
     fetchLessonData()
 
-    // Poll every 3 seconds if video is being generated
-    const pollInterval = setInterval(async () => {
-      const lessonData = await fetchLessonData()
-
-      // Stop polling if video is completed or errored
-      if (lessonData && (lessonData.video_status === 'completed' || lessonData.video_status === 'error')) {
-        clearInterval(pollInterval)
+    // Refetch when this module's video status changes, and on every snapshot: it is sent after
+    // each (re)connect, so it covers anything that changed while we weren't subscribed
+    const unsubscribe = CourseService.subscribeToCourseEvents(parseInt(courseId!), (event) => {
+      const isLessonEvent = event.stage.startsWith('video_') || event.stage.startsWith('audio_')
+      if (event.stage === 'snapshot') {
+        fetchLessonData()
+      } else if (isLessonEvent && event.module_index === parseInt(moduleIndex!)) {
+        if (event.stage === 'video_upgraded' && videoRef.current) {
+          resumeRef.current = { time: videoRef.current.currentTime, playing: !videoRef.current.paused }
+        }
+        fetchLessonData()
       }
-    }, 3000)
+    })
 
-    return () => clearInterval(pollInterval)
+    return unsubscribe
   }, [courseId, moduleIndex])
 
   const handleRetryVideo = async () => {
@@ -90,7 +101,7 @@ export default function ModuleLesson() {
     try {
       setIsRetrying(true)
       await CourseService.retryVideoGeneration(parseInt(courseId), parseInt(moduleIndex))
-      // Polling will automatically pick up the new status
+      // The course event stream will pick up the new status
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to retry video generation')
     } finally {
@@ -256,8 +267,11 @@ export default function ModuleLesson() {
               <div className="aspect-video rounded-2xl overflow-hidden bg-white">
                 <video
                   ref={videoRef}
-                  key={`${courseId}-${moduleIndex}`}
+                  key={`${courseId}-${moduleIndex}-${lesson.video_url}`}
                   controls
+                  poster={lesson.poster_url ? `${API_URL}${lesson.poster_url}` : undefined}
+                  // Paint the poster and only fetch the video on play, unless continuing after an upgrade
+                  preload={resumeRef.current ? 'metadata' : 'none'}
                   className="w-full h-full"
                   onTimeUpdate={(e) => {
                     const video = e.currentTarget
@@ -266,12 +280,25 @@ export default function ModuleLesson() {
                   onLoadedMetadata={(e) => {
                     const video = e.currentTarget
                     setVideoDuration(video.duration)
+                    // Continue where the learner was in the preview
+                    if (resumeRef.current) {
+                      video.currentTime = resumeRef.current.time
+                      if (resumeRef.current.playing) {
+                        video.play().catch(() => {})
+                      }
+                      resumeRef.current = null
+                    }
                   }}
                 >
                   <source src={`${API_URL}${lesson.video_url}`} type="video/mp4" />
                   Your browser does not support the video tag.
                 </video>
               </div>
+              {lesson.video_quality === 'preview' && (
+                <p className="text-xs text-muted-foreground">
+                  Preview quality - a sharper version will replace it automatically when it's ready.
+                </p>
+              )}
               {/* Video Progress Bar */}
               <div className="space-y-1">
                 <div className="flex justify-between text-xs text-muted-foreground">
@@ -288,7 +315,7 @@ export default function ModuleLesson() {
             </div>
           )}
 
-          {lesson.video_status === 'pending' && (
+          {(lesson.video_status === 'pending' || lesson.video_status === 'evicted') && (
             <div className="aspect-video border-2 border-slate-200 rounded-2xl bg-slate-50 flex items-center justify-center">
               <div className="text-center">
                 <PlayCircle className="size-16 text-slate-400 mx-auto mb-4" />
@@ -296,6 +323,15 @@ export default function ModuleLesson() {
               </div>
             </div>
           )}
+
+          {lesson.video_status !== 'completed' && lesson.audio_status === 'completed' && lesson.audio_url && (
+            <div className="mt-4 border-2 border-yellow-200 rounded-2xl bg-yellow-50 p-4 space-y-2">
+              <p className="font-medium">Listen to the narration while your video is being made</p>
+              <audio controls preload="none" className="w-full" src={`${API_URL}${lesson.audio_url}`}>
+                Your browser does not support the audio element.
+              </audio>
+            </div>
+          )}
         </div>
 
         {/* AI Learning Coach */}
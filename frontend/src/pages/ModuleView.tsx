@@ -3,15 +3,17 @@ import { Loader2, PlayCircle, AlertCircle, Sparkles } from 'lucide-react'
 import { useParams, Link } from 'react-router-dom'
 import { Button } from '@/components/ui/button'
 import { CourseService } from '@/services/course'
-import type { Course } from '@/services/course'
+import type { Course, VideoQuality } from '@/services/course'
 
 const API_URL = import.meta.env.VITE_BACKEND_URL || 'http://localhost:3000'
 
 interface ModuleLesson {
   lesson_content: string
   video_url?: string
-  video_status: 'pending' | 'generating' | 'completed' | 'error'
+  video_status: 'pending' | 'generating' | 'completed' | 'error' | 'evicted'
   video_error?: string
+  video_quality?: VideoQuality | null
+  poster_url?: string | null
 }
 
 export default function ModuleView() {
@@ -140,6 +142,8 @@ export default function ModuleView() {
                   ref={videoRef}
                   key={`${courseId}-${moduleIndex}`}
                   controls
+                  poster={lesson.poster_url ? `${API_URL}${lesson.poster_url}` : undefined}
+                  preload="none"
                   className="w-full h-full"
                   onTimeUpdate={(e) => {
                     const video = e.currentTarget
@@ -154,6 +158,11 @@ export default function ModuleView() {
                   Your browser does not support the video tag.
                 </video>
               </div>
+              {lesson.video_quality === 'preview' && (
+                <p className="text-xs text-muted-foreground">
+                  Preview quality - a sharper version will be available shortly.
+                </p>
+              )}
               {/* Video Progress Bar */}
               <div className="space-y-1">
                 <div className="flex justify-between text-xs text-muted-foreground">
@@ -170,7 +179,7 @@ export default function ModuleView() {
             </div>
           )}
 
-          {lesson.video_status === 'pending' && (
+          {(lesson.video_status === 'pending' || lesson.video_status === 'evicted') && (
             <div className="aspect-video border-2 border-slate-200 rounded-2xl bg-slate-50 flex items-center justify-center">
               <div className="text-center">
                 <PlayCircle className="size-16 text-slate-400 mx-auto mb-4" />
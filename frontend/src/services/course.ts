@@ -12,6 +12,7 @@ export interface Course {
   code: string
   description?: string
   modules?: CourseModule[]
+  module_count?: number
   modules_status?: 'pending' | 'generating' | 'completed' | 'error'
   modules_error?: string
 }
@@ -32,23 +33,73 @@ export interface CoursePDF {
 export interface ModuleLesson {
   lesson_content: string
   video_url: string | null
-  video_status: 'pending' | 'generating' | 'completed' | 'error'
+  // 'evicted': deleted under the storage quota, rendered again when the lesson is next opened
+  video_status: 'pending' | 'generating' | 'completed' | 'error' | 'evicted'
   video_error?: string
+  video_quality?: VideoQuality | null
+  // Narration audio, published while the video is still rendering
+  audio_url?: string | null
+  audio_status?: 'generating' | 'completed' | 'error' | null
+  // Frame shown before playback, and a sprite of thumbnails taken every 5 s (5x4 grid, 160 px wide)
+  poster_url?: string | null
+  thumbnail_url?: string | null
+}
+
+// 'preview' is published first and replaced by the full quality render when it finishes
+export type VideoQuality = 'preview' | 'low' | 'medium' | 'high'
+
+export type CourseEventStage =
+  | 'snapshot'
+  | 'pdf_summarized'
+  | 'modules_pending'
+  | 'modules_generating'
+  | 'modules_completed'
+  | 'modules_error'
+  | 'questions_completed'
+  | 'video_pending'
+  | 'video_generating'
+  | 'video_completed'
+  | 'video_error'
+  | 'video_upgraded'
+  | 'video_evicted'
+  | 'audio_completed'
+  | 'audio_error'
+  | 'course_deleted'
+
+export interface CourseEvent {
+  course_id: number
+  stage: CourseEventStage
+  module_index?: number
+  [key: string]: unknown
 }
 
 export class CourseService {
   static async getCourses(): Promise<Course[]> {
-    const response = await fetch(`${API_URL}/api/courses/`, {
-      method: 'GET',
-      credentials: 'include', // Include cookies for authentication
-    })
-
-    if (!response.ok) {
-      const error = await response.json()
-      throw new Error(error.detail || 'Failed to fetch courses')
-    }
-
-    return response.json()
+    const courses: Course[] = []
+    let cursor: string | null = null
+
+    // Follow the keyset cursor until every page has been fetched
+    do {
+      const params = new URLSearchParams({ limit: '100' })
+      if (cursor) {
+        params.set('after', cursor)
+      }
+
+      const response = await fetch(`${API_URL}/api/courses/?${params}`, {
+        method: 'GET',
+        credentials: 'include', // Include cookies for authentication
+      })
+
+      if (!response.ok) {
+        const error = await response.json()
+        throw new Error(error.detail || 'Failed to fetch courses')
+      }
+
+      courses.push(...(await response.json()))
+      cursor = response.headers.get('X-Next-Cursor')
+    } while (cursor)
+
+    return courses
   }
 
   static async getCourse(courseId: number): Promise<Course> {
@@ -156,6 +207,18 @@ export class CourseService {
     }
   }
 
+  static subscribeToCourseEvents(courseId: number, onEvent: (event: CourseEvent) => void): () => void {
+    const source = new EventSource(`${API_URL}/api/courses/${courseId}/events`, {
+      withCredentials: true, // Include cookies for authentication
+    })
+
+    source.onmessage = (message) => {
+      onEvent(JSON.parse(message.data))
+    }
+
+    return () => source.close()
+  }
+
   // Public methods (no authentication required) for shared content
 
   static async getCoursePublic(courseId: number): Promise<Course> {